@@ -1,6 +1,8 @@
 import bpy
 
 from .gui import gui
+from .ops.armature_cache import clear_armature_caches_on_load, invalidate_armature_caches
+from .ops.proxy_action import clear_pending_actions, clear_pending_actions_on_load, queue_assigned_actions
 
 
 bl_info = {
@@ -19,8 +21,11 @@ bl_info = {
 classes = (
     gui.SCENE_OT_ifp_construct_armature,
     gui.OBJECT_OT_ifp_retarget_action,
+    gui.OBJECT_OT_ifp_retarget_actions,
+    gui.OBJECT_OT_ifp_update_retargeted_actions,
     gui.OBJECT_OT_ifp_untarget_action,
     gui.VIEW3D_PT_IFP_Tools,
+    gui.IFP_BoneRestProps,
     gui.IFP_ActionProps,
     gui.ImportGtaIfp,
     gui.ExportGtaIfp,
@@ -35,8 +40,19 @@ def register():
     bpy.types.TOPBAR_MT_file_import.append(gui.menu_func_import)
     bpy.types.TOPBAR_MT_file_export.append(gui.menu_func_export)
 
+    bpy.app.handlers.depsgraph_update_post.append(invalidate_armature_caches)
+    bpy.app.handlers.depsgraph_update_post.append(queue_assigned_actions)
+    bpy.app.handlers.load_post.append(clear_armature_caches_on_load)
+    bpy.app.handlers.load_post.append(clear_pending_actions_on_load)
+
 
 def unregister():
+    clear_pending_actions()
+    bpy.app.handlers.load_post.remove(clear_pending_actions_on_load)
+    bpy.app.handlers.load_post.remove(clear_armature_caches_on_load)
+    bpy.app.handlers.depsgraph_update_post.remove(queue_assigned_actions)
+    bpy.app.handlers.depsgraph_update_post.remove(invalidate_armature_caches)
+
     bpy.types.TOPBAR_MT_file_import.remove(gui.menu_func_import)
     bpy.types.TOPBAR_MT_file_export.remove(gui.menu_func_export)
 
@@ -0,0 +1,215 @@
+"""Benchmark suite for IFP reading, writing and conversion at ped.ifp scale.
+
+Run from the repository root:
+    python benchmarks/bench_ifp.py --save-baseline baseline.json
+    python benchmarks/bench_ifp.py --baseline baseline.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gtaLib.ifp import Anp3, Anp3Bone, Ifp, Keyframe, read_int16, read_int32, read_str, read_uint32
+from synthetic import make_ifp
+
+
+class LegacyAnp3Bone(Anp3Bone):
+    """Per-keyframe decoder used before the bulk path, kept as a reference"""
+
+    @classmethod
+    def read(cls, fd):
+        name = read_str(fd, 24)
+        keyframe_type, keyframes_num = read_uint32(fd, 2)
+        keyframe_type = 'KRT0' if keyframe_type == 4 else 'KR00'
+
+        bone_id = read_int32(fd)
+
+        keyframes = []
+        for _ in range(keyframes_num):
+            qx, qy, qz, qw, time = read_int16(fd, 5)
+            px, py, pz = read_int16(fd, 3) if keyframe_type[2] == 'T' else (0, 0, 0)
+            kf = Keyframe(
+                time,
+                (px/1024.0, py/1024.0, pz/1024.0),
+                (qw/4096.0, qx/4096.0, qy/4096.0, qz/4096.0),
+                (1, 1, 1)
+            )
+            keyframes.append(kf)
+
+        return cls(name, keyframe_type, True, bone_id, 0, 0, keyframes)
+
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def iterate_animations(filepath):
+    for anim in Ifp.iter_animations(filepath):
+        pass
+
+
+def round_trip(src_path, dst_path):
+    Ifp.load(src_path).save(dst_path)
+
+
+def decode_anp3_bones(data, bone_cls):
+    fd = BytesIO(data)
+    fd.seek(4) # ANP3
+    name, animations_num = Anp3.read_header(fd)
+
+    bones = []
+    for _ in range(animations_num):
+        fd.seek(24, os.SEEK_CUR)
+        bones_num = read_uint32(fd, 3)[0]
+        bones += [bone_cls.read(fd) for _ in range(bones_num)]
+    return bones
+
+
+def run_anp3_decode(src_path, repeat):
+    """Compare the bulk ANP3 keyframe decoder with the per-keyframe reference"""
+    with open(src_path, 'rb') as fd:
+        data = fd.read()
+
+    legacy = decode_anp3_bones(data, LegacyAnp3Bone)
+    bulk = decode_anp3_bones(data, Anp3Bone)
+    assert [b.keyframes for b in legacy] == [b.keyframes for b in bulk]
+
+    return {
+        'legacy_decode_s': best_time(lambda: decode_anp3_bones(data, LegacyAnp3Bone), repeat),
+        'decode_s': best_time(lambda: decode_anp3_bones(data, Anp3Bone), repeat),
+    }
+
+
+def run_version(version, args, tmp_dir):
+    src_path = os.path.join(tmp_dir, f'{version}.ifp')
+    dst_path = os.path.join(tmp_dir, f'{version}_out.ifp')
+
+    ifp = make_ifp(version, args.animations, args.bones, args.seed)
+    ifp.save(src_path)
+
+    keyframes_num = sum(len(b.keyframes) for a in ifp.data.animations for b in a.bones)
+    convert_version = 'ANPK' if version == 'ANP3' else 'ANP3'
+
+    metrics = {
+        'file_size': os.path.getsize(src_path),
+        'keyframes': keyframes_num,
+        'load_s': best_time(lambda: Ifp.load(src_path), args.repeat),
+        'lazy_load_s': best_time(lambda: Ifp.load(src_path, lazy=True, use_cache=False), args.repeat),
+        'iter_s': best_time(lambda: iterate_animations(src_path), args.repeat),
+        'save_s': best_time(lambda: ifp.save(dst_path), args.repeat),
+        'round_trip_s': best_time(lambda: round_trip(src_path, dst_path), args.repeat),
+        'convert_s': best_time(lambda: ifp.convert(convert_version, args.fps), args.repeat),
+        'load_peak_bytes': peak_memory(lambda: Ifp.load(src_path)),
+        'iter_peak_bytes': peak_memory(lambda: iterate_animations(src_path)),
+    }
+
+    if version == 'ANP3':
+        metrics.update(run_anp3_decode(src_path, args.repeat))
+
+    return metrics
+
+
+def find_regressions(results, baseline, threshold):
+    regressions = []
+    for version, metrics in baseline.get('results', {}).items():
+        for name, base_value in metrics.items():
+            if not (name.endswith('_s') or name.endswith('_bytes')):
+                continue
+
+            value = results.get(version, {}).get(name)
+            if value is not None and base_value and value > base_value * (1.0 + threshold):
+                regressions.append((version, name, base_value, value))
+    return regressions
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Benchmark IFP load/save on synthetic archives')
+    parser.add_argument('--versions', nargs='+', default=['ANP3', 'ANPK'])
+    parser.add_argument('--animations', type=int, default=300)
+    parser.add_argument('--bones', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--fps', type=float, default=30.0, help='keyframe rate used by the convert case')
+    parser.add_argument('--output', help='write the results to a JSON file')
+    parser.add_argument('--save-baseline', help='write the results as a JSON baseline')
+    parser.add_argument('--baseline', help='compare the results with a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative slowdown or memory growth reported as a regression (default: 0.2)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for version in args.versions:
+            results[version] = metrics = run_version(version, args, tmp_dir)
+            print(f'{version}: {metrics["file_size"] / 1024 / 1024:.1f} MiB, {metrics["keyframes"]} keyframes')
+            for name, value in metrics.items():
+                if name.endswith('_s'):
+                    print(f'    {name:<16} {value:8.3f} s')
+                elif name.endswith('_bytes'):
+                    print(f'    {name:<16} {value / 1024 / 1024:8.1f} MiB')
+
+    report = {
+        'params': {
+            'animations': args.animations,
+            'bones': args.bones,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'fps': args.fps,
+        },
+        'python': sys.version.split()[0],
+        'results': results,
+    }
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as fd:
+                json.dump(report, fd, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as fd:
+            baseline = json.load(fd)
+
+        if baseline.get('params') != report['params']:
+            print('Warning: baseline was recorded with different parameters')
+
+        regressions = find_regressions(results, baseline, args.threshold)
+        for version, name, base_value, value in regressions:
+            print(f'REGRESSION {version} {name}: {base_value:.4g} -> {value:.4g} '
+                  f'(+{(value / base_value - 1.0) * 100:.0f}%)')
+
+        if regressions:
+            return 1
+        print(f'No regressions beyond {args.threshold * 100:.0f}%')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Synthetic IFP archives shaped like the game's ped.ifp"""
+
+import math
+import random
+
+from array import array
+
+from gtaLib.ifp import ANIM_CLASSES, Ifp, KeyframeTrack
+
+
+def make_track(rnd, keyframes_num, has_translation, has_scale, fixed_point):
+    times, rots, poss, scls = array('f'), array('f'), array('f'), array('f')
+
+    axis = [rnd.uniform(-1, 1) for _ in range(3)]
+    axis_len = math.sqrt(sum(v * v for v in axis)) or 1.0
+    axis = [v / axis_len for v in axis]
+    speed = rnd.uniform(0.01, 0.1)
+    origin = [rnd.uniform(-1, 1) for _ in range(3)]
+
+    for i in range(keyframes_num):
+        angle = speed * i + rnd.uniform(-0.01, 0.01)
+        s = math.sin(angle / 2)
+        rot = (math.cos(angle / 2), axis[0] * s, axis[1] * s, axis[2] * s)
+        pos = [o + 0.01 * i * rnd.uniform(0.5, 1.5) for o in origin]
+
+        if fixed_point:
+            times.append(i)
+            rot = [int(v * 4096.0) / 4096.0 for v in rot]
+            pos = [int(v * 1024.0) / 1024.0 for v in pos]
+        else:
+            times.append(i / 30.0)
+
+        rots.extend(rot)
+        if has_translation:
+            poss.extend(pos)
+        if has_scale:
+            scls.extend((1.0, 1.0 + 0.001 * i, 1.0))
+
+    return KeyframeTrack(times, rots, poss, scls)
+
+
+def make_ifp(version, animations_num=300, bones_num=32, seed=0):
+    """Build an archive with varied keyframe counts and keyframe types"""
+    rnd = random.Random(seed)
+    data_cls = ANIM_CLASSES[version]
+    anim_cls = data_cls.get_animation_class()
+    bone_cls = anim_cls.get_bone_class()
+    fixed_point = version == 'ANP3'
+
+    animations = []
+    for a in range(animations_num):
+        keyframes_num = rnd.choice((2, 10, 30, 60, 120))
+        bones = []
+        for b in range(bones_num):
+            if b == 0:
+                keyframe_type = 'KRT0' if fixed_point or rnd.random() < 0.5 else 'KRTS'
+            else:
+                keyframe_type = 'KRT0' if rnd.random() < 0.2 else 'KR00'
+
+            track = make_track(rnd, keyframes_num, keyframe_type[2] == 'T', keyframe_type[3] == 'S', fixed_point)
+            bones.append(bone_cls(f'Bone{b:02d}', keyframe_type, True, b, 0, 0, track))
+
+        animations.append(anim_cls(f'anim_{a:03d}', bones))
+
+    return Ifp(version, data_cls('ped', animations))
@@ -1,48 +1,120 @@
+import hashlib
+import mmap
 import struct
+import sys
 
-from dataclasses import dataclass
-from mathutils import Quaternion, Vector
-from os import SEEK_CUR
-from typing import List
+from array import array
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from operator import sub
+from os import SEEK_CUR, SEEK_END, SEEK_SET
+from typing import List, Tuple
 
+from .ifp_toc import load_toc, save_toc
 
-def read_int16(fd, num=1, en='<'):
-    res = struct.unpack('%s%dh' % (en, num), fd.read(2 * num))
+
+@lru_cache(maxsize=None)
+def get_struct(fmt):
+    return struct.Struct(fmt)
+
+
+def read_val(fd, num, t, en='<'):
+    st = get_struct('%s%d%s' % (en, num, t))
+    res = st.unpack_from(fd.read(st.size))
     return res if num > 1 else res[0]
 
 
+def read_int16(fd, num=1, en='<'):
+    return read_val(fd, num, 'h', en)
+
+
 def read_int32(fd, num=1, en='<'):
-    res = struct.unpack('%s%di' % (en, num), fd.read(4 * num))
-    return res if num > 1 else res[0]
+    return read_val(fd, num, 'i', en)
 
 
 def read_uint32(fd, num=1, en='<'):
-    res = struct.unpack('%s%dI' % (en, num), fd.read(4 * num))
-    return res if num > 1 else res[0]
+    return read_val(fd, num, 'I', en)
 
 
 def read_float32(fd, num=1, en='<'):
-    res = struct.unpack('%s%df' % (en, num), fd.read(4 * num))
-    return res if num > 1 else res[0]
+    return read_val(fd, num, 'f', en)
 
 
 def read_str(fd, max_len):
-    n, res = 0, ''
-    while n < max_len:
-        b = fd.read(1)
-        n += 1
-        if b == b'\x00':
-            break
-        res += b.decode()
-
-    fd.seek(max_len - n, SEEK_CUR)
+    return bytes(fd.read(max_len)).partition(b'\x00')[0].decode()
+
+
+def read_array(fd, typecode, num):
+    res = array(typecode)
+    res.frombytes(fd.read(num * res.itemsize))
+    if sys.byteorder == 'big':
+        res.byteswap()
+    return res
+
+
+def pack_array(buf, offset, values):
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    data = values.tobytes()
+    buf[offset:offset + len(data)] = data
+    return offset + len(data)
+
+
+def quantize(values, scale):
+    return array('h', [int(v * scale) for v in values])
+
+
+def as_float_array(values):
+    if isinstance(values, array) and values.typecode == 'f':
+        return values
+    return array('f', values)
+
+
+def interleave(columns, typecode='f'):
+    stride = len(columns)
+    res = array(typecode)
+    res.frombytes(bytes(res.itemsize * stride * len(columns[0])))
+    for i, c in enumerate(columns):
+        res[i::stride] = c if isinstance(c, array) and c.typecode == typecode else array(typecode, c)
     return res
 
 
+class MemoryReader:
+    """File-like reader over a buffer, read() returns zero-copy memoryview slices"""
+
+    def __init__(self, buffer):
+        self.view = memoryview(buffer)
+        self.offset = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.view.release()
+
+    def read(self, size=-1):
+        start = self.offset
+        end = len(self.view) if size < 0 else min(start + size, len(self.view))
+        self.offset = max(start, end)
+        return self.view[start:end]
+
+    def seek(self, offset, whence=SEEK_SET):
+        if whence == SEEK_CUR:
+            offset += self.offset
+        elif whence == SEEK_END:
+            offset += len(self.view)
+        self.offset = offset
+        return offset
+
+    def tell(self):
+        return self.offset
+
+
 def write_val(fd, vals, t, en='<'):
     data = vals if hasattr(vals, '__len__') else (vals, )
-    data = struct.pack('%s%d%s' % (en, len(data), t), *data)
-    fd.write(data)
+    fd.write(get_struct('%s%d%s' % (en, len(data), t)).pack(*data))
 
 
 def write_uint16(fd, vals, en='<'):
@@ -66,38 +138,258 @@ def write_str(fd, val, max_len):
     fd.write(b'\x00' * (max_len - len(val)))
 
 
+class Packable:
+    """Binary writing on top of get_size() and pack_into()"""
+
+    __slots__ = ()
+
+    def pack(self):
+        buf = bytearray(self.get_size())
+        self.pack_into(buf, 0)
+        return buf
+
+    def write(self, fd):
+        fd.write(self.pack())
+
+
 @dataclass
 class Keyframe:
+    __slots__ = ('time', 'pos', 'rot', 'scl')
+
     time: float
-    pos: Vector
-    rot: Quaternion
-    scl: Vector
+    pos: Tuple[float, float, float]
+    rot: Tuple[float, float, float, float]
+    scl: Tuple[float, float, float]
+
+
+class KeyframeTrack:
+    """Keyframes stored column-wise in float32 arrays.
+
+    rots holds 4 values per keyframe (w, x, y, z), poss and scls hold 3 values
+    per keyframe or are empty when the track has no translations/scales.
+    Indexing and iteration build Keyframe copies of the stored values.
+    """
+
+    __slots__ = ('times', 'rots', 'poss', 'scls')
+
+    def __init__(self, times=(), rots=(), poss=(), scls=()):
+        self.times = as_float_array(times)
+        self.rots = as_float_array(rots)
+        self.poss = as_float_array(poss)
+        self.scls = as_float_array(scls)
+
+    @classmethod
+    def from_keyframes(cls, keyframes):
+        track = cls()
+        for kf in keyframes:
+            track.append(kf)
+        return track
+
+    def __len__(self):
+        return len(self.times)
+
+    def __eq__(self, other):
+        if isinstance(other, (KeyframeTrack, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '%s(%d keyframes)' % (type(self).__name__, len(self))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('keyframe index out of range')
+
+        return Keyframe(
+            self.times[index],
+            tuple(self.poss[index*3:index*3+3]) if self.poss else (0.0, 0.0, 0.0),
+            tuple(self.rots[index*4:index*4+4]),
+            tuple(self.scls[index*3:index*3+3]) if self.scls else (1.0, 1.0, 1.0),
+        )
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def get_poss(self):
+        return self.poss or array('f', (0, 0, 0)) * len(self)
+
+    def get_scls(self):
+        return self.scls or array('f', (1, 1, 1)) * len(self)
+
+    def append(self, kf):
+        # Fill omitted translations/scales with defaults before extending
+        if len(self.poss) != 3 * len(self.times):
+            self.poss = self.get_poss()
+        if len(self.scls) != 3 * len(self.times):
+            self.scls = self.get_scls()
+
+        self.times.append(kf.time)
+        self.rots.extend(kf.rot)
+        self.poss.extend(kf.pos)
+        self.scls.extend(kf.scl)
 
 
 @dataclass
-class Bone:
+class Bone(Packable):
+    __slots__ = ('name', 'keyframe_type', 'use_bone_id', 'bone_id', 'sibling_x', 'sibling_y', 'keyframes')
+
     name: str
     keyframe_type: str
     use_bone_id: bool
     bone_id: int
     sibling_x: int
     sibling_y: int
-    keyframes: List[Keyframe]
+    keyframes: KeyframeTrack
+
+    def __post_init__(self):
+        if not isinstance(self.keyframes, KeyframeTrack):
+            self.keyframes = KeyframeTrack.from_keyframes(self.keyframes)
 
 
 @dataclass
-class Animation:
+class Animation(Packable):
     name: str
     bones: List[Bone]
 
 
 @dataclass
-class IfpData:
+class IfpData(Packable):
     name: str
     animations: List[Animation]
 
+    @classmethod
+    def scan(cls, fd):
+        name, animations_num = cls.read_header(fd)
+        entries = [cls.get_animation_class().scan(fd) for _ in range(animations_num)]
+        return name, entries
+
+    @classmethod
+    def read(cls, fd):
+        name, animations_num = cls.read_header(fd)
+        animations = [cls.get_animation_class().read(fd) for _ in range(animations_num)]
+        return cls(name, animations)
+
+    def get_size(self):
+        return len(self.pack_header(self.name, 0, 0)) + sum(a.get_size() for a in self.animations)
+
+    def pack_into(self, buf, offset):
+        start = offset
+        offset += len(self.pack_header(self.name, 0, 0))
+        for a in self.animations:
+            offset = a.pack_into(buf, offset)
+
+        # The stored size does not include the size field itself
+        header = self.pack_header(self.name, offset - start - 4, len(self.animations))
+        buf[start:start + len(header)] = header
+        return offset
+
+
+@dataclass
+class RawAnimation(Packable):
+    """Encoded animation that is written back verbatim"""
+    name: str
+    data: bytes
+
+    def get_size(self):
+        return len(self.data)
+
+    def pack_into(self, buf, offset):
+        end = offset + len(self.data)
+        buf[offset:end] = self.data
+        return end
+
+
+def get_content_hash(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+@dataclass
+class AnimationEntry:
+    name: str
+    offset: int
+    size: int
+    keyframes_nums: List[int]
+
+    @property
+    def bones_num(self):
+        return len(self.keyframes_nums)
+
+
+class LazyAnimationList(Sequence):
+    """Animations of an IFP file, each one is decoded on first access.
+
+    The file is opened for every read unless the list is opened with open()
+    or used as a context manager, then all reads share one memory map.
+    """
+
+    def __init__(self, anim_cls, filepath, entries):
+        self.anim_cls = anim_cls
+        self.filepath = filepath
+        self.entries = entries
+        self._animations = {}
+        self._fd = None
+        self._mm = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def open(self):
+        if self._mm is None:
+            self._fd = open(self.filepath, 'rb')
+            self._mm = mmap.mmap(self._fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._fd.close()
+            self._mm = self._fd = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        entry = self.entries[index]
+        anim = self._animations.get(entry.offset)
+        if anim is None:
+            anim = self.read_animation(entry)
+            self._animations[entry.offset] = anim
+        return anim
+
+    def read_raw(self, entry):
+        if self._mm is not None:
+            return self._mm[entry.offset:entry.offset + entry.size]
+
+        with open(self.filepath, 'rb') as fd:
+            fd.seek(entry.offset)
+            return fd.read(entry.size)
+
+    def read_animation(self, entry):
+        return self.anim_cls.read(MemoryReader(self.read_raw(entry)))
+
+
+_ANP3_HEADER = struct.Struct('<I24sI')
+_ANP3_ANIMATION_HEADER = struct.Struct('<24s3I')
+_ANP3_BONE_HEADER = struct.Struct('<24s2Ii')
+
 
 class Anp3Bone(Bone):
+    __slots__ = ()
+
     def get_keyframes_size(self):
         s = 16 if self.keyframe_type[2] == 'T' else 10
         return len(self.keyframes) * s
@@ -105,6 +397,13 @@ class Anp3Bone(Bone):
     def get_size(self):
         return 36 + self.get_keyframes_size()
 
+    @staticmethod
+    def scan(fd):
+        fd.seek(24, SEEK_CUR) # name
+        keyframe_type, keyframes_num = read_uint32(fd, 2)
+        fd.seek(4 + keyframes_num * (16 if keyframe_type == 4 else 10), SEEK_CUR)
+        return keyframes_num
+
     @classmethod
     def read(cls, fd):
         name = read_str(fd, 24)
@@ -113,39 +412,36 @@ class Anp3Bone(Bone):
 
         bone_id = read_int32(fd)
 
-        keyframes = []
-        for _ in range(keyframes_num):
-            qx, qy, qz, qw, time = read_int16(fd, 5)
-            px, py, pz = read_int16(fd, 3) if keyframe_type[2] == 'T' else (0, 0, 0)
-            kf = Keyframe(
-                time,
-                Vector((px/1024.0, py/1024.0, pz/1024.0)),
-                Quaternion((qw/4096.0, qx/4096.0, qy/4096.0, qz/4096.0)),
-                Vector((1, 1, 1))
-            )
-            keyframes.append(kf)
+        # Decode the whole keyframe block at once: 5 or 8 int16 per keyframe
+        stride = 8 if keyframe_type[2] == 'T' else 5
+        values = read_array(fd, 'h', keyframes_num * stride)
+
+        rots = interleave([[v / 4096.0 for v in values[i::stride]] for i in (3, 0, 1, 2)])
+        if stride == 8:
+            poss = interleave([[v / 1024.0 for v in values[i::stride]] for i in (5, 6, 7)])
+        else:
+            poss = ()
+
+        keyframes = KeyframeTrack(values[4::stride], rots, poss)
 
         return cls(name, keyframe_type, True, bone_id, 0, 0, keyframes)
 
-    def write(self, fd):
-        keyframe_type = 4 if self.keyframe_type[2] == 'T' else 3
+    def pack_into(self, buf, offset):
+        has_translation = self.keyframe_type[2] == 'T'
+        keyframes = self.keyframes
 
-        write_str(fd, self.name, 24)
-        write_uint32(fd, (keyframe_type, len(self.keyframes)))
-        write_int32(fd, self.bone_id)
+        _ANP3_BONE_HEADER.pack_into(buf, offset, self.name.encode(),
+                                    4 if has_translation else 3, len(keyframes), self.bone_id)
+        offset += _ANP3_BONE_HEADER.size
 
-        for kf in self.keyframes:
-            qx = int(kf.rot.x*4096.0)
-            qy = int(kf.rot.y*4096.0)
-            qz = int(kf.rot.z*4096.0)
-            qw = int(kf.rot.w*4096.0)
-            write_uint16(fd, (qx, qy, qz, qw, int(kf.time)))
+        rots = keyframes.rots
+        columns = [quantize(rots[i::4], 4096.0) for i in (1, 2, 3, 0)]
+        columns.append(quantize(keyframes.times, 1.0))
+        if has_translation:
+            poss = keyframes.get_poss()
+            columns += [quantize(poss[i::3], 1024.0) for i in range(3)]
 
-            if keyframe_type == 4:
-                px = int(kf.pos.x*1024.0)
-                py = int(kf.pos.y*1024.0)
-                pz = int(kf.pos.z*1024.0)
-                write_uint16(fd, (px, py, pz))
+        return pack_array(buf, offset, interleave(columns, 'h'))
 
 
 class Anp3Animation(Animation):
@@ -156,6 +452,14 @@ class Anp3Animation(Animation):
     def get_size(self):
         return 36 + sum(b.get_size() for b in self.bones)
 
+    @classmethod
+    def scan(cls, fd):
+        offset = fd.tell()
+        name = read_str(fd, 24)
+        bones_num, keyframes_size, unk = read_uint32(fd, 3)
+        keyframes_nums = [Anp3Bone.scan(fd) for _ in range(bones_num)]
+        return AnimationEntry(name, offset, fd.tell() - offset, keyframes_nums)
+
     @classmethod
     def read(cls, fd):
         name = read_str(fd, 24)
@@ -163,13 +467,22 @@ class Anp3Animation(Animation):
         bones = [Anp3Bone.read(fd) for _ in range(bones_num)]
         return cls(name, bones)
 
-    def write(self, fd):
-        keyframes_size = sum(b.get_keyframes_size() for b in self.bones)
-
-        write_str(fd, self.name, 24)
-        write_uint32(fd, (len(self.bones), keyframes_size, 1))
+    @staticmethod
+    def rename_raw(data, name):
+        """Copy of the encoded animation data with another name in its fixed size name field"""
+        buf = bytearray(data)
+        get_struct('24s').pack_into(buf, 0, name.encode())
+        return buf
+
+    def pack_into(self, buf, offset):
+        start = offset
+        offset += _ANP3_ANIMATION_HEADER.size
         for b in self.bones:
-            b.write(fd)
+            offset = b.pack_into(buf, offset)
+
+        keyframes_size = offset - start - _ANP3_ANIMATION_HEADER.size - _ANP3_BONE_HEADER.size * len(self.bones)
+        _ANP3_ANIMATION_HEADER.pack_into(buf, start, self.name.encode(), len(self.bones), keyframes_size, 1)
+        return offset
 
 
 class Anp3(IfpData):
@@ -177,24 +490,26 @@ class Anp3(IfpData):
     def get_animation_class():
         return Anp3Animation
 
-    @classmethod
-    def read(cls, fd):
+    @staticmethod
+    def read_header(fd):
         size = read_uint32(fd)
         name = read_str(fd, 24)
         animations_num = read_uint32(fd)
-        animations = [cls.get_animation_class().read(fd) for _ in range(animations_num)]
-        return cls(name, animations)
+        return name, animations_num
 
-    def write(self, fd):
-        size = 28 + sum(a.get_size() for a in self.animations)
-        write_uint32(fd, size)
-        write_str(fd, self.name, 24)
-        write_uint32(fd, len(self.animations))
-        for a in self.animations:
-            a.write(fd)
+    @staticmethod
+    def pack_header(name, size, animations_num):
+        return _ANP3_HEADER.pack(size, name.encode(), animations_num)
 
 
+_ANPK_BONE_HEADERS = {
+    True: struct.Struct('<4sI4sI28s3Ii4sI'),
+    False: struct.Struct('<4sI4sI28s3I2i4sI'),
+}
+
 class AnpkBone(Bone):
+    __slots__ = ()
+
     def get_keyframes_size(self):
         s = 20
         if self.keyframe_type[2] == 'T':
@@ -210,6 +525,26 @@ class AnpkBone(Bone):
             anim_len = 48
         return self.get_keyframes_size() + anim_len + 24
 
+    @staticmethod
+    def get_keyframe_stride(keyframe_type):
+        # Floats per keyframe: rotation (4), [translation (3)], [scale (3)], time (1)
+        stride = 5
+        if keyframe_type[2] == 'T':
+            stride += 3
+        if keyframe_type[3] == 'S':
+            stride += 3
+        return stride
+
+    @staticmethod
+    def scan(fd):
+        fd.seek(4, SEEK_CUR) # CPAN
+        bone_len = read_uint32(fd)
+        offset = fd.tell()
+        fd.seek(36, SEEK_CUR) # ANIM, name
+        keyframes_num = read_uint32(fd)
+        fd.seek(offset + bone_len)
+        return keyframes_num
+
     @classmethod
     def read(cls, fd):
         fd.seek(4, SEEK_CUR) # CPAN
@@ -233,66 +568,66 @@ class AnpkBone(Bone):
             keyframe_type = read_str(fd, 4)
             keyframes_len = read_uint32(fd)
 
-            keyframes = []
-            for _ in range(keyframes_num):
-                qx, qy, qz, qw = read_float32(fd, 4)
-                px, py, pz = read_float32(fd, 3) if keyframe_type[2] == 'T' else (0, 0, 0)
-                sx, sy, sz = read_float32(fd, 3) if keyframe_type[3] == 'S' else (1, 1, 1)
-                time = read_float32(fd)
-
-                rot = Quaternion((qw, qx, qy, qz))
-                rot.conjugate()
-
-                kf = Keyframe(
-                    time,
-                    Vector((px, py, pz)),
-                    rot,
-                    Vector((sx, sy, sz)),
-                )
-                keyframes.append(kf)
+            # Decode the whole keyframe block at once
+            stride = cls.get_keyframe_stride(keyframe_type)
+            values = read_array(fd, 'f', keyframes_num * stride)
+
+            # Rotations are stored conjugated
+            rots = interleave([values[3::stride]] + [[-v for v in values[i::stride]] for i in (0, 1, 2)])
+
+            offset = 4
+            if keyframe_type[2] == 'T':
+                poss = interleave([values[i::stride] for i in range(offset, offset + 3)])
+                offset += 3
+            else:
+                poss = ()
+
+            if keyframe_type[3] == 'S':
+                scls = interleave([values[i::stride] for i in range(offset, offset + 3)])
+            else:
+                scls = ()
+
+            keyframes = KeyframeTrack(values[stride - 1::stride], rots, poss, scls)
         else:
             keyframe_type = 'K000'
-            keyframes = []
+            keyframes = KeyframeTrack()
 
         return cls(name, keyframe_type, use_bone_id, bone_id, sibling_x, sibling_y, keyframes)
 
-    def write(self, fd):
-        keyframes_num = len(self.keyframes)
+    def pack_into(self, buf, offset):
+        keyframes = self.keyframes
+        keyframes_num = len(keyframes)
         if self.use_bone_id:
             anim_len = 44
+            ids = (self.bone_id, )
         else:
             anim_len = 48
+            ids = (self.sibling_x, self.sibling_y)
 
         keyframes_len = self.get_keyframes_size()
         bone_len = keyframes_len + anim_len + 16
 
-        write_str(fd, 'CPAN', 4)
-        write_uint32(fd, bone_len)
-        write_str(fd, 'ANIM', 4)
-        write_uint32(fd, anim_len)
-        write_str(fd, self.name, 28)
-        write_uint32(fd, (keyframes_num, 0, keyframes_num - 1))
-
-        if self.use_bone_id:
-            write_int32(fd, self.bone_id)
-        else:
-            write_int32(fd, (self.sibling_x, self.sibling_y))
-
-        write_str(fd, self.keyframe_type, 4)
-        write_uint32(fd, keyframes_len)
+        header = _ANPK_BONE_HEADERS[self.use_bone_id]
+        header.pack_into(buf, offset, b'CPAN', bone_len, b'ANIM', anim_len, self.name.encode(),
+                         keyframes_num, 0, keyframes_num - 1, *ids,
+                         self.keyframe_type.encode(), keyframes_len)
+        offset += header.size
 
-        for kf in self.keyframes:
-            rot = kf.rot.copy()
-            rot.conjugate()
-            write_float32(fd, (rot.x, rot.y, rot.z, rot.w))
+        # Rotations are stored conjugated
+        rots = keyframes.rots
+        columns = [array('f', [-v for v in rots[i::4]]) for i in (1, 2, 3)]
+        columns.append(rots[0::4])
 
-            if self.keyframe_type[2] == 'T':
-                write_float32(fd, kf.pos)
+        if self.keyframe_type[2] == 'T':
+            poss = keyframes.get_poss()
+            columns += [poss[i::3] for i in range(3)]
 
-            if self.keyframe_type[3] == 'S':
-                write_float32(fd, kf.scl)
+        if self.keyframe_type[3] == 'S':
+            scls = keyframes.get_scls()
+            columns += [scls[i::3] for i in range(3)]
 
-            write_float32(fd, kf.time)
+        columns.append(keyframes.times)
+        return pack_array(buf, offset, interleave(columns))
 
 
 class AnpkAnimation(Animation):
@@ -304,6 +639,23 @@ class AnpkAnimation(Animation):
         name_align_len = (4 - name_len % 4) % 4
         return 32 + name_len + name_align_len + sum(b.get_size() for b in self.bones)
 
+    @classmethod
+    def scan(cls, fd):
+        offset = fd.tell()
+        fd.seek(4, SEEK_CUR) # NAME
+        name_len = read_uint32(fd)
+        name = read_str(fd, name_len)
+        fd.seek((4 - name_len % 4) % 4, SEEK_CUR)
+        fd.seek(4, SEEK_CUR) # DGAN
+        animation_size = read_uint32(fd)
+        animation_end = fd.tell() + animation_size
+        fd.seek(4, SEEK_CUR) # INFO
+        unk_size, bones_num = read_uint32(fd, 2)
+        fd.seek(unk_size - 4, SEEK_CUR)
+        keyframes_nums = [AnpkBone.scan(fd) for _ in range(bones_num)]
+        fd.seek(animation_end)
+        return AnimationEntry(name, offset, animation_end - offset, keyframes_nums)
+
     @classmethod
     def read(cls, fd):
         fd.seek(4, SEEK_CUR) # NAME
@@ -318,19 +670,20 @@ class AnpkAnimation(Animation):
         bones = [AnpkBone.read(fd) for _ in range(bones_num)]
         return cls(name, bones)
 
-    def write(self, fd):
+    def pack_into(self, buf, offset):
         name_len = len(self.name) + 1
-        animation_size = 16 + sum(b.get_size() for b in self.bones)
-
-        write_str(fd, 'NAME', 4)
-        write_uint32(fd, name_len)
-        write_str(fd, self.name, name_len + (4 - name_len % 4) % 4)
-        write_str(fd, 'DGAN', 4)
-        write_uint32(fd, animation_size)
-        write_str(fd, 'INFO', 4)
-        write_uint32(fd, (8, len(self.bones), 0))
+        name_align_len = (4 - name_len % 4) % 4
+
+        header = get_struct('<4sI%ds4sI4s3I' % (name_len + name_align_len))
+        start = offset
+        offset += header.size
         for b in self.bones:
-            b.write(fd)
+            offset = b.pack_into(buf, offset)
+
+        animation_size = offset - start - header.size + 16
+        header.pack_into(buf, start, b'NAME', name_len, self.name.encode(), b'DGAN', animation_size,
+                         b'INFO', 8, len(self.bones), 0)
+        return offset
 
 
 class Anpk(IfpData):
@@ -338,29 +691,105 @@ class Anpk(IfpData):
     def get_animation_class():
         return AnpkAnimation
 
-    @classmethod
-    def read(cls, fd):
+    @staticmethod
+    def read_header(fd):
         size = read_uint32(fd)
         fd.seek(4, SEEK_CUR) # INFO
         info_len, animations_num = read_uint32(fd, 2)
         name = read_str(fd, info_len - 4)
         fd.seek((4 - info_len % 4) % 4, SEEK_CUR)
+        return name, animations_num
 
-        animations = [cls.get_animation_class().read(fd) for _ in range(animations_num)]
-        return cls(name, animations)
-
-    def write(self, fd):
-        name_len = len(self.name) + 1
+    @staticmethod
+    def pack_header(name, size, animations_num):
+        name_len = len(name) + 1
         info_len = name_len + 4
         name_align_len = (4 - name_len % 4) % 4
-        size = 12 + name_len + name_align_len + sum(a.get_size() for a in self.animations)
 
-        write_uint32(fd, size)
-        write_str(fd, 'INFO', 4)
-        write_uint32(fd, (info_len, len(self.animations)))
-        write_str(fd, self.name, name_len + name_align_len)
-        for a in self.animations:
-            a.write(fd)
+        header = get_struct('<I4s2I%ds' % (name_len + name_align_len))
+        return header.pack(size, b'INFO', info_len, animations_num, name.encode())
+
+
+@dataclass
+class TranscodeStats:
+    """Maximum quantization errors of a transcode, time errors are in seconds"""
+
+    time_error: float = 0.0
+    rotation_error: float = 0.0
+    translation_error: float = 0.0
+    clamped_values: int = 0
+    dropped_scales: int = 0
+
+    def update_errors(self, **errors):
+        for name, error in errors.items():
+            setattr(self, name, max(getattr(self, name), error))
+
+
+# Adding and subtracting 1.5 * 2**52 rounds a double to the nearest integer, ties to even like round()
+_ROUNDING_BIAS = 6755399441055744.0
+
+
+def quantize_fixed(values, scale, stats=None, error=None, dequantize=True):
+    """Round values to ANP3 int16 fixed point numbers.
+
+    Returns the fixed point numbers divided by scale, which must be a power of two,
+    or the fixed point numbers themselves when dequantize is False. Clamped values
+    are counted in stats and the maximum rounding error is recorded under error.
+    """
+    scale = float(scale)
+    bias = _ROUNDING_BIAS
+    if dequantize:
+        # A bias divided by a power of two rounds to multiples of 1 / scale
+        bias /= scale
+        low, high = -32768.0 / scale, 32767.0 / scale
+        res = array('f', [v + bias - bias for v in values])
+    else:
+        low, high = -32768.0, 32767.0
+        res = array('f', [v * scale + bias - bias for v in values])
+
+    if not res:
+        return res
+
+    if min(res) < low or max(res) > high:
+        if stats is not None:
+            stats.clamped_values += sum(1 for v in res if v < low or v > high)
+        res = array('f', [min(max(v, low), high) for v in res])
+
+    if stats is not None and error:
+        dequantized = res if dequantize else map((1.0 / scale).__mul__, res)
+        stats.update_errors(**{error: max(map(abs, map(sub, values, dequantized)))})
+
+    return res
+
+
+def transcode_bone(bone, bone_cls, fps, stats=None):
+    kfs = bone.keyframes
+
+    if bone_cls is Anp3Bone:
+        # Seconds to frames, float to fixed point rotations and translations, no scales
+        frames = quantize_fixed(kfs.times, fps, stats, 'time_error', dequantize=False)
+        rots = quantize_fixed(kfs.rots, 4096.0, stats, 'rotation_error')
+        poss = quantize_fixed(kfs.poss, 1024.0, stats, 'translation_error')
+
+        if stats is not None and kfs.scls and (min(kfs.scls) < 1.0 - 1e-6 or max(kfs.scls) > 1.0 + 1e-6):
+            stats.dropped_scales += 1
+
+        keyframes = KeyframeTrack(frames, rots, poss)
+        keyframe_type = 'KRT0' if bone.keyframe_type[2] == 'T' else 'KR00'
+        return bone_cls(bone.name, keyframe_type, True, bone.bone_id, 0, 0, keyframes)
+
+    # Frames to seconds, fixed point values are exact in float32
+    times = array('f', [t / fps for t in kfs.times])
+    keyframes = KeyframeTrack(times, kfs.rots[:], kfs.poss[:], kfs.scls[:])
+    return bone_cls(bone.name, bone.keyframe_type, bone.use_bone_id, bone.bone_id,
+                    bone.sibling_x, bone.sibling_y, keyframes)
+
+
+def transcode_animation(anim, data_cls, fps, stats=None):
+    """Convert a decoded animation to the animation class of another IFP data class"""
+    anim_cls = data_cls.get_animation_class()
+    bone_cls = anim_cls.get_bone_class()
+    return anim_cls(anim.name, [transcode_bone(b, bone_cls, fps, stats) for b in anim.bones])
 
 
 ANIM_CLASSES = {
@@ -374,27 +803,140 @@ class Ifp:
     version: str
     data: object
 
-    @classmethod
-    def read(cls, fd):
+    @staticmethod
+    def read_version(fd):
         version = read_str(fd, 4)
 
         anim_cls = ANIM_CLASSES.get(version)
         if not anim_cls:
             raise Exception('Unknown IFP version')
 
+        return version, anim_cls
+
+    @classmethod
+    def read(cls, fd):
+        version, anim_cls = cls.read_version(fd)
         data = anim_cls.read(fd)
         return cls(version, data)
 
+    @classmethod
+    def scan(cls, fd, filepath):
+        version, anim_cls = cls.read_version(fd)
+        name, entries = anim_cls.scan(fd)
+        animations = LazyAnimationList(anim_cls.get_animation_class(), filepath, entries)
+        return cls(version, anim_cls(name, animations))
+
+    @classmethod
+    def from_toc(cls, filepath, toc):
+        anim_cls = ANIM_CLASSES[toc['version']]
+        entries = [AnimationEntry(**e) for e in toc['animations']]
+        animations = LazyAnimationList(anim_cls.get_animation_class(), filepath, entries)
+        return cls(toc['version'], anim_cls(toc['name'], animations))
+
     def write(self, fd):
-        write_str(fd, self.version, 4)
-        self.data.write(fd)
-        fd.write(b'\x00' * (2048 - (fd.tell() % 2048)))
+        # Single buffer with the IFP data and the padding to 2048 bytes
+        size = 4 + self.data.get_size()
+        buf = bytearray(size + 2048 - size % 2048)
+        buf[0:4] = self.version.encode()
+        self.data.pack_into(buf, 4)
+        fd.write(buf)
+
+    @classmethod
+    def load(cls, filepath, lazy=False, use_cache=True):
+        # Lazy loading reuses the cached table of contents of an unchanged file
+        if lazy and use_cache:
+            toc = load_toc(filepath)
+            if toc and toc['version'] in ANIM_CLASSES:
+                return cls.from_toc(filepath, toc)
+
+        with open(filepath, 'rb') as fd, \
+                mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                MemoryReader(mm) as reader:
+            if not lazy:
+                return cls.read(reader)
+
+            ifp = cls.scan(reader, filepath)
+
+        if use_cache:
+            entries = ifp.data.animations.entries
+            save_toc(filepath, ifp.version, ifp.data.name, [asdict(e) for e in entries])
+
+        return ifp
 
     @classmethod
-    def load(cls, filepath):
-        with open(filepath, 'rb') as fd:
-            return cls.read(fd)
+    def iter_animations(cls, filepath):
+        """Yield the animations of an IFP file one by one without keeping them"""
+        with open(filepath, 'rb') as fd, \
+                mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                MemoryReader(mm) as reader:
+            version, data_cls = cls.read_version(reader)
+            name, animations_num = data_cls.read_header(reader)
+
+            anim_cls = data_cls.get_animation_class()
+            for _ in range(animations_num):
+                yield anim_cls.read(reader)
+
+    @staticmethod
+    def decode_animation(version, data):
+        """Decode one animation from its raw bytes"""
+        return ANIM_CLASSES[version].get_animation_class().read(MemoryReader(data))
 
     def save(self, filepath):
         with open(filepath, 'wb') as fd:
             return self.write(fd)
+
+    def convert(self, version, fps=30.0, stats=None):
+        """Return a copy of the IFP in another version, fps scales keyframe times between seconds and frames"""
+        if version == self.version:
+            return self
+
+        data_cls = ANIM_CLASSES[version]
+        animations = [transcode_animation(a, data_cls, fps, stats) for a in self.data.animations]
+        return Ifp(version, data_cls(self.data.name, animations))
+
+
+class IfpWriter:
+    """Streaming IFP writer, animations are written as soon as they are added.
+
+    The archive size and the animations count are patched into the header on close().
+    """
+
+    def __init__(self, fd, version, name):
+        data_cls = ANIM_CLASSES.get(version)
+        if not data_cls:
+            raise Exception('Unknown IFP version')
+
+        self.fd = fd
+        self.version = version
+        self.name = name
+        self.data_cls = data_cls
+        self.start = fd.tell()
+        self.animations_num = 0
+
+        header = data_cls.pack_header(name, 0, 0)
+        fd.write(version.encode())
+        fd.write(header)
+        self.size = len(header)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+    def write_animation(self, anim):
+        data = anim.pack()
+        self.fd.write(data)
+        self.size += len(data)
+        self.animations_num += 1
+
+    def close(self):
+        fd = self.fd
+        size = 4 + self.size
+        fd.write(b'\x00' * (2048 - size % 2048))
+        end = fd.tell()
+
+        fd.seek(self.start + 4)
+        fd.write(self.data_cls.pack_header(self.name, self.size - 4, self.animations_num))
+        fd.seek(end)
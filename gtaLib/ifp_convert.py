@@ -0,0 +1,148 @@
+"""Batch converter for directories of IFP files.
+
+Usage (from the add-on directory):
+    python -m gtaLib.ifp_convert SRC_DIR DST_DIR [--version ANP3] [--name-from-file] [--jobs N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from .ifp import ANIM_CLASSES, Ifp, TranscodeStats
+
+
+@dataclass
+class ConvertTask:
+    src: str
+    dst: str
+    version: str
+    name: str
+    fps: float
+
+
+@dataclass
+class ConvertResult:
+    src: str
+    dst: str
+    src_size: int
+    dst_size: int
+    animations_num: int
+    seconds: float
+    error: str
+    stats: TranscodeStats = None
+
+
+def find_ifp_files(src_dir):
+    res = []
+    for root, dirs, files in os.walk(src_dir):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.lower().endswith('.ifp'):
+                res.append(os.path.relpath(os.path.join(root, filename), src_dir))
+    return res
+
+
+def convert_file(task):
+    start = time.perf_counter()
+    try:
+        ifp = Ifp.load(task.src)
+        stats = None
+        if task.version and task.version != ifp.version:
+            stats = TranscodeStats()
+            ifp = ifp.convert(task.version, task.fps, stats)
+        if task.name is not None:
+            # ANP3 names are stored in 24 bytes with a terminating zero
+            ifp.data.name = task.name[:23] if ifp.version == 'ANP3' else task.name
+
+        os.makedirs(os.path.dirname(task.dst) or '.', exist_ok=True)
+        ifp.save(task.dst)
+
+        return ConvertResult(task.src, task.dst, os.path.getsize(task.src), os.path.getsize(task.dst),
+                             len(ifp.data.animations), time.perf_counter() - start, '', stats)
+
+    except Exception as e:
+        return ConvertResult(task.src, task.dst, 0, 0, 0, time.perf_counter() - start, str(e) or type(e).__name__)
+
+
+def create_tasks(args):
+    tasks = []
+    for rel_path in find_ifp_files(args.src_dir):
+        name = args.name
+        if args.name_from_file:
+            name = os.path.splitext(os.path.basename(rel_path))[0]
+        tasks.append(ConvertTask(
+            os.path.join(args.src_dir, rel_path),
+            os.path.join(args.dst_dir, rel_path),
+            args.version,
+            name,
+            args.fps,
+        ))
+    return tasks
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m gtaLib.ifp_convert',
+                                     description='Convert or re-save a directory of GTA IFP files')
+    parser.add_argument('src_dir', help='directory with .ifp files, searched recursively')
+    parser.add_argument('dst_dir', help='output directory, the source tree layout is kept')
+    parser.add_argument('--version', choices=sorted(ANIM_CLASSES), default=None,
+                        help='output IFP version, the source version is kept by default')
+    parser.add_argument('--name', default=None, help='archive name for all output files')
+    parser.add_argument('--name-from-file', action='store_true',
+                        help='use the file name without extension as the archive name')
+    parser.add_argument('--fps', type=float, default=30.0,
+                        help='frames per second used to convert between GTA 3/VC and SA times')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='number of worker processes (default: number of cores)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if os.path.abspath(args.src_dir) == os.path.abspath(args.dst_dir):
+        print('Output directory must differ from the source directory', file=sys.stderr)
+        return 2
+
+    tasks = create_tasks(args)
+    if not tasks:
+        print('No IFP files found')
+        return 0
+
+    jobs = max(1, min(args.jobs, len(tasks)))
+    start = time.perf_counter()
+    failed = 0
+    total_size = 0
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # Results come back in the task order, output does not depend on the workers count
+        for res in executor.map(convert_file, tasks):
+            if res.error:
+                failed += 1
+                print(f'FAILED {res.src}: {res.error}')
+                continue
+
+            total_size += res.src_size
+            throughput = res.src_size / 1024 / 1024 / res.seconds if res.seconds else 0.0
+            print(f'{res.src} -> {res.dst}: {res.animations_num} animations, '
+                  f'{res.src_size} -> {res.dst_size} bytes, {res.seconds:.3f} s, {throughput:.1f} MiB/s')
+
+            st = res.stats
+            if st:
+                print(f'    max error: rotation {st.rotation_error:.6f}, translation {st.translation_error:.6f}, '
+                      f'time {st.time_error:.6f} s; clamped values: {st.clamped_values}, '
+                      f'bones with dropped scales: {st.dropped_scales}')
+
+    elapsed = time.perf_counter() - start
+    print(f'Converted {len(tasks) - failed}/{len(tasks)} files with {jobs} workers in {elapsed:.2f} s '
+          f'({total_size / 1024 / 1024 / elapsed:.1f} MiB/s)')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
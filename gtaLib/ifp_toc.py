@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import sys
+
+
+TOC_CACHE_VERSION = 1
+
+
+def get_cache_dir():
+    cache_dir = os.environ.get('IFP_TOC_CACHE_DIR')
+    if cache_dir:
+        return cache_dir
+
+    if sys.platform == 'win32':
+        base_dir = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    elif sys.platform == 'darwin':
+        base_dir = os.path.expanduser('~/Library/Caches')
+    else:
+        base_dir = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+
+    return os.path.join(base_dir, 'io_scene_gta_ifp', 'toc')
+
+
+def get_file_key(filepath):
+    filepath = os.path.normcase(os.path.abspath(filepath))
+    st = os.stat(filepath)
+    return filepath, st.st_size, st.st_mtime_ns
+
+
+def get_cache_path(filepath):
+    digest = hashlib.sha1(filepath.encode('utf-8', 'surrogateescape')).hexdigest()
+    return os.path.join(get_cache_dir(), digest + '.json')
+
+
+def load_toc(filepath):
+    """Return the cached table of contents of an IFP file or None if it is missing or outdated"""
+    try:
+        path, size, mtime_ns = get_file_key(filepath)
+        with open(get_cache_path(path), 'r', encoding='utf-8') as fd:
+            toc = json.load(fd)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(toc, dict) or toc.get('cache_version') != TOC_CACHE_VERSION:
+        return None
+
+    if (toc.get('path'), toc.get('size'), toc.get('mtime_ns')) != (path, size, mtime_ns):
+        return None
+
+    if not isinstance(toc.get('version'), str) or not isinstance(toc.get('name'), str):
+        return None
+
+    animations = toc.get('animations')
+    if not isinstance(animations, list) or not all(is_valid_entry(e, size) for e in animations):
+        return None
+
+    return toc
+
+
+def is_valid_entry(entry, file_size):
+    """Whether a cached animation entry has the fields of AnimationEntry and lies within the file"""
+    if not isinstance(entry, dict) or set(entry) != {'name', 'offset', 'size', 'keyframes_nums'}:
+        return False
+
+    offset, size, keyframes_nums = entry['offset'], entry['size'], entry['keyframes_nums']
+    if not isinstance(entry['name'], str) or not isinstance(offset, int) or not isinstance(size, int):
+        return False
+
+    if offset < 0 or size < 0 or offset + size > file_size:
+        return False
+
+    return isinstance(keyframes_nums, list) and all(isinstance(n, int) for n in keyframes_nums)
+
+
+def save_toc(filepath, version, name, animations):
+    """Store the table of contents of an IFP file, animations is a list of dicts"""
+    try:
+        path, size, mtime_ns = get_file_key(filepath)
+        cache_path = get_cache_path(path)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+
+        toc = {
+            'cache_version': TOC_CACHE_VERSION,
+            'path': path,
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'version': version,
+            'name': name,
+            'animations': animations,
+        }
+
+        tmp_path = '%s.%d.tmp' % (cache_path, os.getpid())
+        with open(tmp_path, 'w', encoding='utf-8') as fd:
+            json.dump(toc, fd, separators=(',', ':'))
+        os.replace(tmp_path, cache_path)
+
+    except OSError:
+        # The cache is optional
+        pass
@@ -1,4 +1,7 @@
 import bpy
+import math
+import os
+import time
 
 from bpy.props import (
     BoolProperty,
@@ -11,12 +14,39 @@ from bpy_extras.io_utils import (
     ImportHelper,
     ExportHelper,
 )
+from fnmatch import fnmatchcase
 
+from ..ops.armature_cache import get_armature_cache
 from ..ops.armature_constructor import ArmatureConstructor
-from ..ops.action_retargeter import retarget_action, untarget_action
-from ..ops.ifp_importer import create_action
+from ..ops.common import count_action_fcurves
+from ..ops.action_retargeter import is_ifp_action, retarget_action, untarget_action, update_retargeted_action
+from ..ops.ifp_importer import (
+    clear_action,
+    create_action,
+    get_action_source,
+    replace_action,
+    restore_action_source,
+    set_action_source,
+)
 from ..ops.ifp_exporter import create_ifp_animations
-from ..gtaLib.ifp import Ifp, ANIM_CLASSES
+from ..ops.keyframe_reducer import KeyframeReducer
+from ..ops.operator_stats import OperatorStats
+from ..ops.proxy_action import create_proxy_action, materialize_action_safe
+from ..ops.retarget_cache import retarget_cache
+from ..gtaLib.ifp import Ifp, IfpWriter, RawAnimation, ANIM_CLASSES, get_content_hash
+
+
+def get_path_key(filepath):
+    return os.path.normcase(os.path.abspath(filepath))
+
+
+def get_name_patterns(text):
+    return [p.strip().lower() for p in text.split(',') if p.strip()]
+
+
+def match_name_patterns(name, patterns):
+    name = name.lower()
+    return any(fnmatchcase(name, p) for p in patterns)
 
 
 class SCENE_OT_ifp_construct_armature(bpy.types.Operator):
@@ -74,6 +104,122 @@ class OBJECT_OT_ifp_retarget_action(bpy.types.Operator):
         return {'FINISHED'}
 
 
+class OBJECT_OT_ifp_retarget_actions(bpy.types.Operator):
+    bl_idname           = "object.ifp_retarget_actions"
+    bl_description      = "Adjust all IFP actions or the actions matching a filter to the active armature"
+    bl_label            = "Retarget All Actions"
+    bl_options          = {'UNDO'}
+
+    action_names: StringProperty(
+        name="Actions",
+        description="Comma-separated names of actions to retarget, wildcards are allowed. "
+                    "Leave empty to retarget all IFP actions",
+        default='',
+    )
+
+    use_profile: BoolProperty(
+        name="Profile",
+        description="Capture a cProfile of the retargeting and print the slowest functions to the console",
+        default=False,
+    )
+
+    @classmethod
+    def poll(cls, context):
+        arm_obj = context.object
+        return arm_obj and type(arm_obj.data) == bpy.types.Armature
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        arm_obj = context.object
+        patterns = get_name_patterns(self.action_names)
+
+        stats = OperatorStats('retarget', '', self.use_profile)
+
+        # Bone lookups and rest matrices are shared by all actions
+        with stats.stage('armature_cache'):
+            cache = get_armature_cache(arm_obj)
+
+        missing_bones = set()
+        failed_actions = []
+        cache_hits = retarget_cache.hits
+
+        for act in bpy.data.actions:
+            if patterns and not match_name_patterns(act.name, patterns):
+                continue
+
+            if not is_ifp_action(act):
+                continue
+
+            with stats.stage('retarget_action'):
+                if act.ifp.is_proxy:
+                    mb, error = materialize_action_safe(act, arm_obj, cache)
+                    if error:
+                        failed_actions.append(f'{act.name}: {error}')
+                        continue
+                else:
+                    mb = retarget_action(act, arm_obj, cache)
+
+            missing_bones.update(mb)
+            stats.count('actions')
+            stats.count('fcurves', count_action_fcurves(act))
+
+        stats.count('missing_bones', len(missing_bones))
+        stats.count('retarget_cache_hits', retarget_cache.hits - cache_hits)
+        stats.finish()
+        stats.write_log()
+
+        bpy.ops.message.ifp_import_report('INVOKE_DEFAULT',
+                                          missing_bones_message='\n'.join(sorted(missing_bones)),
+                                          failed_actions_message='\n'.join(failed_actions),
+                                          retargeted_actions=stats.counters['actions'],
+                                          stats_message='\n'.join(stats.format_lines()))
+
+        return {'FINISHED'}
+
+
+class OBJECT_OT_ifp_update_retargeted_actions(bpy.types.Operator):
+    bl_idname           = "object.ifp_update_retargeted_actions"
+    bl_description      = "Regenerate the bones of the actions targeted to the active armature that were renamed, added or removed, or whose rest pose has changed"
+    bl_label            = "Update Retargeted Actions"
+    bl_options          = {'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        arm_obj = context.object
+        return arm_obj and type(arm_obj.data) == bpy.types.Armature
+
+    def execute(self, context):
+        arm_obj = context.object
+        # Rest pose edits are not always seen by the cache invalidation
+        cache = get_armature_cache(arm_obj, refresh=True)
+
+        missing_bones = set()
+        actions_count = 0
+        bones_count = 0
+
+        for act in bpy.data.actions:
+            if act.ifp.target_armature != arm_obj or act.ifp.is_proxy:
+                continue
+
+            updated_bones, mb = update_retargeted_action(act, arm_obj, cache)
+            missing_bones.update(mb)
+
+            if updated_bones:
+                actions_count += 1
+                bones_count += len(updated_bones)
+
+        self.report({'INFO'}, f'Updated {bones_count} bones in {actions_count} actions')
+
+        if missing_bones:
+            bpy.ops.message.ifp_import_report('INVOKE_DEFAULT',
+                                              missing_bones_message='\n'.join(sorted(missing_bones)),
+                                              retargeted_actions=actions_count)
+
+        return {'FINISHED'}
+
+
 class OBJECT_OT_ifp_untarget_action(bpy.types.Operator):
     bl_idname           = "object.ifp_untarget_action"
     bl_description      = "Clear the active action from the targeted armature"
@@ -108,13 +254,20 @@ class ImportReport(bpy.types.Operator):
     bl_label = "IFP Import Report"
 
     missing_bones_message: StringProperty(default='')
+    failed_actions_message: StringProperty(default='')
     created_actions: IntProperty(default=0)
+    retargeted_actions: IntProperty(default=0)
+    stats_message: StringProperty(default='')
 
     def execute(self, context):
         if self.created_actions > 0:
             self.report({'INFO'}, f'Created {self.created_actions} IFP actions')
+        if self.retargeted_actions > 0:
+            self.report({'INFO'}, f'Retargeted {self.retargeted_actions} IFP actions')
         if self.missing_bones_message:
             self.report({'WARNING'}, 'Missing bones:\n' + self.missing_bones_message)
+        if self.failed_actions_message:
+            self.report({'WARNING'}, 'Could not load proxy actions:\n' + self.failed_actions_message)
         return {'FINISHED'}
 
     def invoke(self, context, event):
@@ -124,6 +277,8 @@ class ImportReport(bpy.types.Operator):
         layout = self.layout
         if self.created_actions > 0:
             layout.label(text=f'Created {self.created_actions} IFP actions', icon='INFO')
+        if self.retargeted_actions > 0:
+            layout.label(text=f'Retargeted {self.retargeted_actions} IFP actions', icon='INFO')
 
         if self.missing_bones_message:
             layout.label(text='Missing bones:')
@@ -132,6 +287,20 @@ class ImportReport(bpy.types.Operator):
                 if text:
                     box.label(text=text, icon='BONE_DATA')
 
+        if self.failed_actions_message:
+            layout.label(text='Could not load proxy actions:')
+            box = layout.box()
+            for text in self.failed_actions_message.split('\n'):
+                if text:
+                    box.label(text=text, icon='ERROR')
+
+        if self.stats_message:
+            layout.label(text='Statistics:')
+            box = layout.box()
+            for text in self.stats_message.split('\n'):
+                if text:
+                    box.label(text=text, icon='TIME')
+
 
 class ImportGtaIfp(bpy.types.Operator, ImportHelper):
     bl_idname = "import_scene.gta_ifp"
@@ -153,35 +322,199 @@ class ImportGtaIfp(bpy.types.Operator, ImportHelper):
         default=True,
     )
 
-    def execute(self, context):
-        fps = self.fps
-        use_armature = self.use_armature
-        arm_obj = None
+    animation_names: StringProperty(
+        name="Animations",
+        description="Comma-separated names of animations to import, wildcards are allowed. "
+                    "Leave empty to import all animations",
+        default='',
+    )
 
-        if use_armature:
-            arm_obj = context.view_layer.objects.active
-            if arm_obj and type(arm_obj.data) != bpy.types.Armature:
-                arm_obj = None
+    use_profile: BoolProperty(
+        name="Profile",
+        description="Capture a cProfile of the import and print the slowest functions to the console",
+        default=False,
+    )
 
-        ifp = Ifp.load(self.filepath)
-        if not ifp.data:
-            return {'CANCELLED'}
+    use_proxy: BoolProperty(
+        name="Proxy Actions",
+        description="Create empty actions that build their keyframes when they are assigned to an object "
+                    "or exported. Exported proxies keep their original data",
+        default=False,
+    )
+
+    use_update: BoolProperty(
+        name="Update Existing",
+        description="Update actions imported from the same file in place instead of creating new ones. "
+                    "Only animations whose data has changed are rebuilt",
+        default=False,
+    )
+
+    use_modal: BoolProperty(
+        name="Background Import",
+        description="Import in small steps while keeping the interface responsive. "
+                    "Press Esc to cancel and remove the imported actions, "
+                    "existing actions are only updated once the import has completed",
+        default=False,
+    )
+
+    def get_animation_patterns(self):
+        return get_name_patterns(self.animation_names)
+
+    def begin_import(self, context):
+        self._fps = self.fps
+        self._arm_obj = None
+
+        if self.use_armature:
+            arm_obj = context.view_layer.objects.active
+            if arm_obj and type(arm_obj.data) == bpy.types.Armature:
+                self._arm_obj = arm_obj
+                self._arm_cache = get_armature_cache(arm_obj)
+
+        patterns = self.get_animation_patterns()
+        self._stats = stats = OperatorStats('import', self.filepath, self.use_profile)
+
+        # Animations are decoded one by one from their raw data, which is also hashed.
+        # The table of contents is only cached for imports of selected animations
+        with stats.stage('load'):
+            ifp = Ifp.load(self.filepath, lazy=True, use_cache=bool(patterns))
+            if not ifp.data:
+                stats.finish()
+                return False
+
+            # Every raw read of the import shares one memory map of the file
+            animations = ifp.data.animations
+            animations.open()
+            if patterns:
+                animations = [i for i, entry in enumerate(animations.entries)
+                              if match_name_patterns(entry.name, patterns)]
+            else:
+                animations = range(len(animations))
 
         if ifp.version == 'ANP3':
-            fps = 1.0
+            self._fps = 1.0
+
+        self._ifp = ifp
+        self._animations = animations
+        self._next_index = 0
+        self._next_update = 0
+        self._missing_bones = set()
+        self._created_actions = []
+        self._existing_actions = {}
+        self._pending_updates = []
+        self._new_actions = []
+        self._replaced_actions = []
+        self._saved_sources = []
+        self._prev_action = None
+        self._prev_action_slot = None
+
+        if self._arm_obj and self._arm_obj.animation_data:
+            self._prev_action = self._arm_obj.animation_data.action
+            if bpy.app.version >= (4, 4, 0):
+                self._prev_action_slot = self._arm_obj.animation_data.action_slot
+
+        if self.use_update:
+            filepath = get_path_key(self.filepath)
+            self._existing_actions = {
+                act.ifp.source_name: act for act in bpy.data.actions
+                if act.ifp.source_name and get_path_key(bpy.path.abspath(act.ifp.source_path)) == filepath
+            }
 
-        missing_bones = set()
-        actions_count = 0
+        return True
+
+    def import_proxy(self, entry, content_hash):
+        with self._stats.stage('create_proxy'):
+            act = create_proxy_action(self.filepath, self._ifp.version, entry, content_hash, self._fps)
+            act.name = entry.name
+            self._created_actions.append(act)
+
+        self._stats.count('proxies')
+
+    def prepare_update(self, act, entry, data, content_hash):
+        """Queue the update of an action imported from the same file, changed animations
+        are rebuilt in a copy of the action that replaces it once the import has completed"""
+        stats = self._stats
+        props = act.ifp
+        new_act = None
+
+        if props.content_hash == content_hash and props.source_fps == self._fps:
+            stats.count('unchanged_actions')
+        else:
+            stats.count('updated_actions')
+            if not props.is_proxy:
+                new_act = self.rebuild_action(act, entry, data, content_hash)
+
+        # Offsets can move even if the animation itself is unchanged
+        self._pending_updates.append((act, new_act, entry, content_hash))
+
+    def rebuild_action(self, act, entry, data, content_hash):
+        stats = self._stats
+
+        with stats.stage('load'):
+            anim = Ifp.decode_animation(self._ifp.version, data)
+
+        with stats.stage('create_action'):
+            # The copy keeps the slots and the settings of the action
+            new_act = act.copy()
+            self._new_actions.append(new_act)
+            clear_action(new_act)
+            create_action(anim, self._fps, new_act)
+            set_action_source(new_act, self.filepath, self._ifp.version, entry, content_hash, self._fps)
+
+        arm_obj = new_act.ifp.target_armature
+        if arm_obj:
+            with stats.stage('retarget_action'):
+                self._missing_bones.update(retarget_action(new_act, arm_obj))
+
+        stats.count('fcurves', count_action_fcurves(new_act))
+        return new_act
+
+    def apply_update(self, act, new_act, entry, content_hash):
+        if new_act:
+            # Users and NLA strips move to the rebuilt action, the old one is kept until the import has completed
+            replace_action(act, new_act)
+            self._replaced_actions.append((act, new_act))
+        else:
+            self._saved_sources.append((act, get_action_source(act)))
+            set_action_source(act, self.filepath, self._ifp.version, entry, content_hash, self._fps)
+
+    def import_animation(self, index):
+        stats = self._stats
+        arm_obj = self._arm_obj
+        animations = self._ifp.data.animations
+
+        with stats.stage('load'):
+            entry = animations.entries[index]
+            data = animations.read_raw(entry)
+            content_hash = get_content_hash(data)
+
+        act = self._existing_actions.get(entry.name)
+        if act:
+            self.prepare_update(act, entry, data, content_hash)
+            return
 
-        for anim in ifp.data.animations:
-            act = create_action(anim, fps)
+        if self.use_proxy:
+            self.import_proxy(entry, content_hash)
+            return
+
+        with stats.stage('load'):
+            anim = Ifp.decode_animation(self._ifp.version, data)
+
+        stats.count('animations')
+        stats.count('bones', len(anim.bones))
+        stats.count('keyframes', sum(len(b.keyframes) for b in anim.bones))
+
+        with stats.stage('create_action'):
+            act = create_action(anim, self._fps)
             act.name = anim.name
-            actions_count += 1
+            set_action_source(act, self.filepath, self._ifp.version, entry, content_hash, self._fps)
+            self._created_actions.append(act)
 
-            if arm_obj:
-                mb = retarget_action(act, arm_obj)
-                missing_bones.update(mb)
+        if arm_obj:
+            with stats.stage('retarget_action'):
+                mb = retarget_action(act, arm_obj, self._arm_cache)
+                self._missing_bones.update(mb)
 
+            with stats.stage('assign_action'):
                 animation_data = arm_obj.animation_data
                 if not animation_data:
                     animation_data = arm_obj.animation_data_create()
@@ -190,12 +523,162 @@ class ImportGtaIfp(bpy.types.Operator, ImportHelper):
                 if bpy.app.version >= (4, 4, 0):
                     animation_data.action_slot = act.slots[-1]
 
+        stats.count('fcurves', count_action_fcurves(act))
+
+    def finish_import(self):
+        self._ifp.data.animations.close()
+
+        for act, _ in self._replaced_actions:
+            bpy.data.actions.remove(act)
+
+        stats = self._stats
+        stats.count('missing_bones', len(self._missing_bones))
+        stats.finish()
+        stats.write_log()
+
         bpy.ops.message.ifp_import_report('INVOKE_DEFAULT',
-                                            missing_bones_message='\n'.join(missing_bones),
-                                            created_actions=actions_count)
+                                            missing_bones_message='\n'.join(self._missing_bones),
+                                            created_actions=len(self._created_actions),
+                                            stats_message='\n'.join(stats.format_lines()))
+
+    def cancel_import(self):
+        """Restore the armature's action and the updated actions, remove every action created so far"""
+        self._ifp.data.animations.close()
+
+        arm_obj = self._arm_obj
+        try:
+            if arm_obj and arm_obj.animation_data:
+                arm_obj.animation_data.action = self._prev_action
+                if self._prev_action and self._prev_action_slot:
+                    arm_obj.animation_data.action_slot = self._prev_action_slot
+        except ReferenceError:
+            # The armature or the previous action was removed while importing
+            pass
+
+        for act, new_act in reversed(self._replaced_actions):
+            try:
+                replace_action(new_act, act)
+            except ReferenceError:
+                pass
+
+        for act, source in reversed(self._saved_sources):
+            try:
+                restore_action_source(act, source)
+            except ReferenceError:
+                pass
+
+        for act in self._created_actions + self._new_actions:
+            try:
+                bpy.data.actions.remove(act)
+            except ReferenceError:
+                pass
+
+        self._stats.finish()
+        self._created_actions.clear()
+        self._pending_updates.clear()
+        self._new_actions.clear()
+        self._replaced_actions.clear()
+        self._saved_sources.clear()
+
+    def import_step(self, deadline):
+        """Build actions, then apply the pending updates, until the deadline has passed.
+        Does at least one step per call and returns whether the import has completed"""
+        animations = self._animations
+        updates = self._pending_updates
+
+        while self._next_index < len(animations):
+            self.import_animation(animations[self._next_index])
+            self._next_index += 1
+            if time.perf_counter() >= deadline:
+                break
+        else:
+            # Existing actions are only changed once every animation has been built
+            while self._next_update < len(updates):
+                self.apply_update(*updates[self._next_update])
+                self._next_update += 1
+                if time.perf_counter() >= deadline:
+                    break
+
+        return self._next_index >= len(animations) and self._next_update >= len(updates)
+
+    def execute(self, context):
+        if not self.begin_import(context):
+            return {'CANCELLED'}
+
+        if self.use_modal:
+            self._time_slice = 1.0 / 30.0
+
+            # Progress is the share of the imported animations and applied updates
+            wm = context.window_manager
+            self._timer = wm.event_timer_add(0.01, window=context.window)
+            wm.progress_begin(0, 1)
+            wm.modal_handler_add(self)
+            return {'RUNNING_MODAL'}
+
+        self.import_step(math.inf)
+        self.finish_import()
+        return {'FINISHED'}
+
+    def end_modal(self, context):
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+        context.workspace.status_text_set(None)
+
+    def update_progress(self, context):
+        animations = self._animations
+        animations_num = len(animations)
+        updates = self._pending_updates
+        updates_num = len(updates)
+
+        if self._next_index < animations_num:
+            entries = self._ifp.data.animations.entries
+            status = (f'Importing {entries[animations[self._next_index]].name} '
+                      f'({self._next_index + 1}/{animations_num})')
+        else:
+            status = (f'Updating {updates[self._next_update][0].name} '
+                      f'({self._next_update + 1}/{updates_num})')
+
+        context.window_manager.progress_update((self._next_index + self._next_update) / (animations_num + updates_num))
+        context.workspace.status_text_set(status + ', press Esc to cancel')
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self.end_modal(context)
+            self.cancel_import()
+            self.report({'WARNING'}, 'IFP import cancelled')
+            return {'CANCELLED'}
+
+        if event.type != 'TIMER' or event.timer != self._timer:
+            return {'PASS_THROUGH'}
+
+        # Build actions until the time slice is spent, then hand control back to the interface
+        try:
+            completed = self.import_step(time.perf_counter() + self._time_slice)
+        except ReferenceError:
+            # The armature was removed while importing
+            self.end_modal(context)
+            self.cancel_import()
+            self.report({'ERROR'}, 'IFP import cancelled: the armature was removed')
+            return {'CANCELLED'}
+        except Exception as e:
+            self.end_modal(context)
+            self.cancel_import()
+            self.report({'ERROR'}, f'IFP import cancelled: {e}')
+            return {'CANCELLED'}
 
+        if not completed:
+            self.update_progress(context)
+            return {'RUNNING_MODAL'}
+
+        self.end_modal(context)
+        self.finish_import()
         return {'FINISHED'}
 
+    def cancel(self, context):
+        self.end_modal(context)
+        self.cancel_import()
+
 
 class ExportGtaIfp(bpy.types.Operator, ExportHelper):
     bl_idname = "export_scene.gta_ifp"
@@ -227,6 +710,34 @@ class ExportGtaIfp(bpy.types.Operator, ExportHelper):
         default=30.0,
     )
 
+    use_reduce_keyframes: BoolProperty(
+        name="Reduce Keyframes",
+        description="Drop keyframes that interpolation of the neighbouring keyframes rebuilds within the tolerances",
+        default=False,
+    )
+
+    reduce_angle_tolerance: FloatProperty(
+        name="Angle Tolerance",
+        description="Maximum rotation error of dropped keyframes",
+        subtype='ANGLE',
+        default=0.001745329,
+        min=0.0,
+    )
+
+    reduce_location_tolerance: FloatProperty(
+        name="Location Tolerance",
+        description="Maximum translation and scale error of dropped keyframes",
+        default=0.001,
+        min=0.0,
+        precision=4,
+    )
+
+    use_profile: BoolProperty(
+        name="Profile",
+        description="Capture a cProfile of the export and print the slowest functions to the console",
+        default=False,
+    )
+
     def draw(self, context):
         layout = self.layout
 
@@ -234,6 +745,14 @@ class ExportGtaIfp(bpy.types.Operator, ExportHelper):
         layout.prop(self, "ifp_name")
         layout.prop(self, "fps")
 
+        layout.prop(self, "use_reduce_keyframes")
+        col = layout.column()
+        col.enabled = self.use_reduce_keyframes
+        col.prop(self, "reduce_angle_tolerance")
+        col.prop(self, "reduce_location_tolerance")
+
+        layout.prop(self, "use_profile")
+
         box = layout.box()
         box.label(text="Actions to Export:")
 
@@ -256,10 +775,52 @@ class ExportGtaIfp(bpy.types.Operator, ExportHelper):
 
         actions = [act for act in bpy.data.actions if act.ifp.use_export]
 
-        animations = create_ifp_animations(context, ifp_cls, actions, fps)
-        data = ifp_cls(name, animations)
-        ifp = Ifp(version, data)
-        ifp.save(self.filepath)
+        reducer = None
+        if self.use_reduce_keyframes:
+            reducer = KeyframeReducer(self.reduce_angle_tolerance, self.reduce_location_tolerance)
+
+        stats = OperatorStats('export', self.filepath, self.use_profile)
+        animations = create_ifp_animations(context, ifp_cls, actions, fps, reducer)
+
+        # Write each animation as soon as it is converted into a temporary file,
+        # the previous export is only replaced once the whole file is written
+        tmp_filepath = self.filepath + '.tmp'
+        try:
+            with open(tmp_filepath, 'wb') as fd, IfpWriter(fd, version, name) as writer:
+                while True:
+                    with stats.stage('create_animation'):
+                        anim = next(animations, None)
+                    if anim is None:
+                        break
+
+                    if isinstance(anim, RawAnimation):
+                        stats.count('raw_animations')
+                    else:
+                        stats.count('animations')
+                        stats.count('bones', len(anim.bones))
+                        stats.count('keyframes', sum(len(b.keyframes) for b in anim.bones))
+
+                    with stats.stage('write'):
+                        writer.write_animation(anim)
+            os.replace(tmp_filepath, self.filepath)
+        except BaseException:
+            if os.path.exists(tmp_filepath):
+                os.remove(tmp_filepath)
+            raise
+
+        stats.finish()
+        stats.write_log()
+        self.report({'INFO'}, 'IFP export: ' + ', '.join(stats.format_lines()))
+
+        if reducer:
+            size_before = size_after = 0
+            for anim_name, anim_size_before, anim_size_after in reducer.results:
+                if self.use_profile:
+                    print(f'{anim_name}: {anim_size_before} -> {anim_size_after} bytes '
+                          f'(saved {anim_size_before - anim_size_after})')
+                size_before += anim_size_before
+                size_after += anim_size_after
+            self.report({'INFO'}, f'Keyframe reduction saved {size_before - size_after} of {size_before} bytes')
 
         return {'FINISHED'}
 
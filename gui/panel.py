@@ -3,6 +3,8 @@ import bpy
 from .operator import (
     SCENE_OT_ifp_construct_armature,
     OBJECT_OT_ifp_retarget_action,
+    OBJECT_OT_ifp_retarget_actions,
+    OBJECT_OT_ifp_update_retargeted_actions,
     OBJECT_OT_ifp_untarget_action,
 )
 
@@ -19,6 +21,8 @@ class VIEW3D_PT_IFP_Tools(bpy.types.Panel):
         layout = self.layout
         layout.operator(SCENE_OT_ifp_construct_armature.bl_idname, icon="ARMATURE_DATA")
         layout.operator(OBJECT_OT_ifp_retarget_action.bl_idname, icon="ACTION")
+        layout.operator(OBJECT_OT_ifp_retarget_actions.bl_idname, icon="ACTION_TWEAK")
+        layout.operator(OBJECT_OT_ifp_update_retargeted_actions.bl_idname, icon="FILE_REFRESH")
         layout.operator(OBJECT_OT_ifp_untarget_action.bl_idname, icon="REMOVE")
 
         arm_obj = context.object
@@ -36,3 +40,5 @@ class VIEW3D_PT_IFP_Tools(bpy.types.Panel):
         if act:
             action_target_arm = act.ifp.target_armature
             box.label(text=f"Target Armature: {action_target_arm.name if action_target_arm else None}")
+            if act.ifp.materialize_error:
+                box.label(text=f"Proxy Error: {act.ifp.materialize_error}", icon='ERROR')
@@ -2,14 +2,39 @@ import bpy
 
 from bpy.props import (
     BoolProperty,
+    CollectionProperty,
+    FloatProperty,
+    IntProperty,
     PointerProperty,
+    StringProperty,
 )
 
 
+class IFP_BoneRestProps(bpy.types.PropertyGroup):
+
+    ifp_bone: StringProperty(name="IFP Bone")
+    rest_hash: StringProperty(name="Rest Hash")
+
+
 class IFP_ActionProps(bpy.types.PropertyGroup):
 
     use_export: BoolProperty(name="Use Export", default=True)
     target_armature: PointerProperty(name="Target Armature", type=bpy.types.Object)
 
+    # Rest poses of the pose bones at the time they were retargeted
+    bone_rests: CollectionProperty(name="Bone Rests", type=IFP_BoneRestProps)
+
+    # Source animation of imported actions, proxy actions keep only this data
+    is_proxy: BoolProperty(name="Proxy", default=False)
+    source_path: StringProperty(name="Source File", subtype='FILE_PATH')
+    source_name: StringProperty(name="Source Animation")
+    source_version: StringProperty(name="Source Version")
+    source_offset: IntProperty(name="Source Offset")
+    source_size: IntProperty(name="Source Size")
+    source_fps: FloatProperty(name="Source FPS", default=1.0)
+    content_hash: StringProperty(name="Content Hash")
+    # Proxies that could not be loaded are not retried on assignment
+    materialize_error: StringProperty(name="Materialize Error")
+
     def register():
         bpy.types.Action.ifp = bpy.props.PointerProperty(type=IFP_ActionProps)
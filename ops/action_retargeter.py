@@ -1,45 +1,64 @@
 import bpy
+import hashlib
 
 from bpy_extras import anim_utils
-from collections import defaultdict
-from mathutils import Matrix, Quaternion
 
-from .common import set_keyframe, translation_matrix, scale_matrix
+from .armature_cache import get_armature_cache
+from .common import (
+    make_quats_continuous,
+    quat_rotation_difference,
+    set_keyframes,
+    transform_locations,
+    transform_scales,
+)
+from .fcurve_reader import BoneChannels, parse_ifp_data_path, parse_pose_data_path
+from .retarget_cache import BoneTracks, retarget_cache
 
 
 POSEDATA_PREFIX = 'pose.bones["%s"].'
 
 
-def find_bone_by_id(arm_obj, bone_id):
-    for bone in arm_obj.data.bones:
-        if bone.get('bone_id') == bone_id:
-            return bone
-
-
-def local_to_basis_matrix(local_matrix, global_matrix, parent_matrix):
-    return global_matrix.inverted() @ (parent_matrix @ local_matrix)
-
-
 def get_ifp_channelbag(act):
     slot = act.slots.get('OBIFP')
     if slot:
         return anim_utils.action_get_channelbag_for_slot(act, slot)
 
 
-def untarget_action(act):
-    act.ifp.target_armature = None
+def get_action_curves(act):
+    """Groups and fcurves of the IFP slot of an action, None if it has no IFP slot"""
+    if bpy.app.version < (4, 4, 0):
+        return act.groups, act.fcurves
+
+    channelbag = get_ifp_channelbag(act)
+    if not channelbag:
+        return None, None
+
+    return channelbag.groups, channelbag.fcurves
+
+
+def get_ifp_fcurves(fcurves, ifp_group):
+    return [c for c in fcurves if c.group == ifp_group]
+
+
+def is_ifp_action(act):
+    """Whether an action stores IFP keyframes or is a proxy of an IFP animation"""
+    if act.ifp.is_proxy:
+        return True
 
     if bpy.app.version < (4, 4, 0):
-        groups = act.groups
-        fcurves = act.fcurves
+        return 'ifp' in act.groups
+
+    channelbag = get_ifp_channelbag(act)
+    return bool(channelbag) and 'ifp' in channelbag.groups
 
-    else:
-        channelbag = get_ifp_channelbag(act)
-        if not channelbag:
-            return
 
-        groups = channelbag.groups
-        fcurves = channelbag.fcurves
+def untarget_action(act):
+    act.ifp.target_armature = None
+    act.ifp.bone_rests.clear()
+
+    groups, fcurves = get_action_curves(act)
+    if groups is None:
+        return
 
     ifp_group = groups.get('ifp')
     if not ifp_group:
@@ -55,115 +74,219 @@ def untarget_action(act):
             groups.remove(group)
 
 
-def retarget_action(act, arm_obj):
-    untarget_action(act)
+def untarget_bones(act, bone_names):
+    """Remove the pose bone fcurves of the given bones, the IFP data is kept"""
+    groups, fcurves = get_action_curves(act)
+    if groups is None:
+        return
+
+    ifp_group = groups.get('ifp')
+    if not ifp_group:
+        return
+
+    for c in list(fcurves):
+        if c.group != ifp_group and parse_pose_data_path(c.data_path)[0] in bone_names:
+            fcurves.remove(c)
+
+    for group in list(groups):
+        if group != ifp_group and not group.channels:
+            groups.remove(group)
+
+    bone_rests = act.ifp.bone_rests
+    for i in reversed(range(len(bone_rests))):
+        if bone_rests[i].name in bone_names:
+            bone_rests.remove(i)
+
 
-    act.ifp.target_armature = arm_obj
+def get_bone_targets(ifp_fcurves, cache):
+    """IFP bone and rest hash of each pose bone the IFP bones of an action resolve to"""
+    targets = {}
+    ifp_bones = set()
+    for c in ifp_fcurves:
+        bone_name, bone_id, channel = parse_ifp_data_path(c.data_path)
+        if bone_name in ifp_bones:
+            continue
 
-    missing_bones = set()
+        ifp_bones.add(bone_name)
+        bone = cache.find_bone(bone_name, bone_id)
+        if bone:
+            targets[bone.name] = (bone_name, bone.rest_hash)
 
-    if bpy.app.version < (4, 4, 0):
-        groups = act.groups
-        fcurves = act.fcurves
+    return targets
 
-    else:
-        channelbag = get_ifp_channelbag(act)
-        if not channelbag:
-            return missing_bones
 
-        groups = channelbag.groups
-        fcurves = channelbag.fcurves
+def get_outdated_bones(act, cache, ifp_fcurves):
+    """Pose bones whose IFP bone or rest pose has changed since the action was retargeted, None if it is unknown"""
+    bone_rests = act.ifp.bone_rests
+    if not bone_rests:
+        return None
 
-    ifp_group = groups.get('ifp')
+    # Renamed, removed and added bones change the mapping as well as edited rest poses
+    retargeted = {snapshot.name: (snapshot.ifp_bone, snapshot.rest_hash) for snapshot in bone_rests}
+    targets = get_bone_targets(ifp_fcurves, cache)
+
+    return {name for name in retargeted.keys() | targets.keys() if retargeted.get(name) != targets.get(name)}
+
+
+def update_retargeted_action(act, arm_obj, cache=None):
+    """Retarget only the bones whose mapping or rest pose has changed, returns them with the missing bones"""
+    if cache is None:
+        cache = get_armature_cache(arm_obj)
+
+    groups, fcurves = get_action_curves(act)
+    ifp_group = groups.get('ifp') if groups is not None else None
     if not ifp_group:
-        return missing_bones
+        return set(), set()
+
+    outdated_bones = get_outdated_bones(act, cache, get_ifp_fcurves(fcurves, ifp_group))
+    if outdated_bones is None:
+        # Retargeted without snapshots, every bone is regenerated
+        missing_bones = retarget_action(act, arm_obj, cache)
+        return {s.name for s in act.ifp.bone_rests}, missing_bones
+
+    if not outdated_bones:
+        return outdated_bones, set()
 
+    return outdated_bones, retarget_action(act, arm_obj, cache, outdated_bones)
+
+
+def read_ifp_channels(fcurves):
+    """Read every IFP curve once and group its keyframes by bone"""
     act_bones = {}
     for c in fcurves:
-        _, bone_name, bone_id, movement = c.data_path.split('//')
-        use_bone_id = bone_id != 'None'
-        bone_id = int(bone_id) if use_bone_id else None
+        bone_name, bone_id, channel = parse_ifp_data_path(c.data_path)
 
         bone_data = act_bones.get(bone_name)
         if not bone_data:
-            bone_data = (
-                bone_id,
-                defaultdict(lambda: [None, None, None, None]),
-                defaultdict(lambda: [None, None, None]),
-                defaultdict(lambda: [None, None, None])
-            )
-
-        chan = bone_data[{'R':1, 'T':2, 'S':3}[movement]]
-        for kp in c.keyframe_points:
-            k, v = kp.co
-            chan[k][c.array_index] = v
-
-        act_bones[bone_name] = bone_data
-
-    for bone_name, bone_data in act_bones.items():
-        bone_id, rots, locs, scls = bone_data
-
-        bone = None
-        if bone_id is not None and bone_id != -1:
-            bone = find_bone_by_id(arm_obj, bone_id)
-        if not bone:
-            bone = arm_obj.data.bones.get(bone_name)
+            bone_data = act_bones[bone_name] = (bone_id, BoneChannels())
+
+        bone_data[1].add_curve(channel, c)
+
+    return act_bones
 
+
+def get_ifp_channels_hash(act_bones):
+    content_hash = hashlib.sha1()
+    for bone_name, (bone_id, channels) in act_bones.items():
+        content_hash.update(repr((bone_name, bone_id)).encode())
+        channels.update_hash(content_hash)
+    return content_hash.hexdigest()
+
+
+def compute_bone_tracks(act_bones, cache, bone_names=None):
+    """Convert the IFP channels of each bone to pose space, returns the tracks and the missing bones"""
+    tracks = []
+    missing_bones = set()
+
+    for bone_name, (bone_id, channels) in act_bones.items():
+        bone = cache.find_bone(bone_name, bone_id)
         if not bone:
             missing_bones.add(bone_name)
             continue
 
-        group = groups.new(name=bone_name)
-        bone_name = bone.name
+        if bone_names is not None and bone.name not in bone_names:
+            continue
+
+        # Convert whole tracks at once
+        times = channels.get_times('rotation_quaternion')
+        values = quat_rotation_difference(bone.local_rot_array, channels.get_values('rotation_quaternion', times))
+        rots = (times, make_quats_continuous(values))
+
+        locs = None
+        if 'location' in channels:
+            times = channels.get_times('location')
+            locs = (times, transform_locations(bone.local_to_basis_array, channels.get_values('location', times)))
+
+        scls = None
+        if 'scale' in channels:
+            times = channels.get_times('scale')
+            scls = (times, transform_scales(bone.local_to_basis_array, channels.get_values('scale', times)))
+
+        tracks.append(BoneTracks(bone_name, bone.name, bone.rest_hash, rots, locs, scls))
+
+    return tracks, frozenset(missing_bones)
+
+
+def apply_bone_tracks(act, arm_obj, groups, fcurves, tracks):
+    for tr in tracks:
+        snapshot = act.ifp.bone_rests.add()
+        snapshot.name = tr.bone_name
+        snapshot.ifp_bone = tr.group_name
+        snapshot.rest_hash = tr.rest_hash
+
+        group = groups.new(name=tr.group_name)
+        bone_name = tr.bone_name
         pose_bone = arm_obj.pose.bones[bone_name]
         pose_bone.rotation_mode = 'QUATERNION'
         pose_bone.location = (0, 0, 0)
         pose_bone.rotation_quaternion = (1, 0, 0, 0)
         pose_bone.scale = (1, 1, 1)
 
-        rest_mat = bone.matrix_local
-        if bone.parent:
-            parent_mat = bone.parent.matrix_local
-            local_rot = (parent_mat.inverted_safe() @ rest_mat).to_quaternion()
-        else:
-            parent_mat = Matrix.Identity(4)
-            local_rot = rest_mat.to_quaternion()
-
         cr = [fcurves.new(data_path=(POSEDATA_PREFIX % bone_name) + 'rotation_quaternion', index=i) for i in range(4)]
         for c in cr:
             c.group = group
+        set_keyframes(cr, *tr.rots)
 
-        if locs:
+        if tr.locs is not None:
             cl = [fcurves.new(data_path=(POSEDATA_PREFIX % bone_name) + 'location', index=i) for i in range(3)]
             for c in cl:
                 c.group = group
+            set_keyframes(cl, *tr.locs)
 
-        if scls:
+        if tr.scls is not None:
             cs = [fcurves.new(data_path=(POSEDATA_PREFIX % bone_name) + 'scale', index=i) for i in range(3)]
             for c in cs:
                 c.group = group
+            set_keyframes(cs, *tr.scls)
+
+
+def retarget_action(act, arm_obj, cache=None, bone_names=None):
+    """Generate pose bone fcurves from the IFP data, bone_names limits them to these pose bones"""
+    if bone_names is None:
+        untarget_action(act)
+    else:
+        untarget_bones(act, bone_names)
+
+    if cache is None:
+        cache = get_armature_cache(arm_obj)
+
+    act.ifp.target_armature = arm_obj
+
+    missing_bones = set()
+
+    groups, fcurves = get_action_curves(act)
+    if groups is None:
+        return missing_bones
 
-        prev_rot = None
-        for time in sorted(rots.keys()):
-            rot = local_rot.rotation_difference(Quaternion(rots[time]))
-            if prev_rot:
-                alt_rot = rot.copy()
-                alt_rot.negate()
-                if rot.rotation_difference(prev_rot).angle > alt_rot.rotation_difference(prev_rot).angle:
-                    rot = alt_rot
-            prev_rot = rot
-            set_keyframe(cr, time, rot)
-
-        for time in sorted(locs.keys()):
-            mat = translation_matrix(locs[time])
-            mat_basis = local_to_basis_matrix(mat, rest_mat, parent_mat)
-            loc = mat_basis.to_translation()
-            set_keyframe(cl, time, loc)
-
-        for time in sorted(scls.keys()):
-            mat = scale_matrix(scls[time])
-            mat_basis = local_to_basis_matrix(mat, rest_mat, parent_mat)
-            scl = mat_basis.to_scale()
-            set_keyframe(cs, time, scl)
-
-    return missing_bones
+    ifp_group = groups.get('ifp')
+    if not ifp_group:
+        return missing_bones
+
+    if bone_names is not None:
+        # The pose curves of the other bones are kept
+        act_bones = read_ifp_channels(get_ifp_fcurves(fcurves, ifp_group))
+        tracks, missing_bones = compute_bone_tracks(act_bones, cache, bone_names)
+        apply_bone_tracks(act, arm_obj, groups, fcurves, tracks)
+        return set(missing_bones)
+
+    # Imported actions are identified by the hash of their source data, others by their curves
+    act_bones = None
+    props = act.ifp
+    if props.content_hash:
+        content_key = (props.content_hash, props.source_fps)
+    else:
+        act_bones = read_ifp_channels(fcurves)
+        content_key = get_ifp_channels_hash(act_bones)
+
+    # Skeletons with the same fingerprint reuse the converted tracks
+    key = (content_key, cache.fingerprint)
+    result = retarget_cache.get(key)
+    if result is None:
+        if act_bones is None:
+            act_bones = read_ifp_channels(fcurves)
+        result = compute_bone_tracks(act_bones, cache)
+        retarget_cache.put(key, result)
+
+    tracks, missing_bones = result
+    apply_bone_tracks(act, arm_obj, groups, fcurves, tracks)
+    return set(missing_bones)
@@ -0,0 +1,120 @@
+import bpy
+import hashlib
+import numpy as np
+
+from bpy.app.handlers import persistent
+from mathutils import Matrix
+
+
+# Rest matrices are compared at this precision
+REST_HASH_PRECISION = 1e-5
+
+
+def quantize_matrix(mat):
+    return tuple(int(round(v / REST_HASH_PRECISION)) for row in mat for v in row)
+
+
+def get_rest_hash(rest_mat, parent_mat):
+    data = repr((quantize_matrix(rest_mat), quantize_matrix(parent_mat))).encode()
+    return hashlib.sha1(data).hexdigest()
+
+
+class BoneRest:
+    """Rest pose matrices of a bone used to convert between IFP and pose space"""
+
+    __slots__ = ('name', 'bone_id', 'parent_name', 'rest_hash', 'rest_mat', 'parent_mat', 'local_to_basis', 'basis_to_local',
+                 'local_rot', 'local_rot_inv', 'local_rot_array', 'local_rot_inv_array',
+                 'local_to_basis_array', 'basis_to_local_array')
+
+    def __init__(self, bone):
+        self.name = bone.name
+        self.bone_id = bone.get('bone_id')
+        self.parent_name = bone.parent.name if bone.parent else None
+
+        self.rest_mat = bone.matrix_local.copy()
+        if bone.parent:
+            self.parent_mat = bone.parent.matrix_local.copy()
+            self.local_rot = (self.parent_mat.inverted_safe() @ self.rest_mat).to_quaternion()
+        else:
+            self.parent_mat = Matrix.Identity(4)
+            self.local_rot = self.rest_mat.to_quaternion()
+
+        self.local_rot_inv = self.local_rot.inverted()
+        self.local_to_basis = self.rest_mat.inverted() @ self.parent_mat
+        self.basis_to_local = self.parent_mat.inverted() @ self.rest_mat
+
+        self.rest_hash = get_rest_hash(self.rest_mat, self.parent_mat)
+
+        # The same data for whole keyframe arrays
+        self.local_rot_array = np.array(self.local_rot, dtype=np.float64)
+        self.local_rot_inv_array = np.array(self.local_rot_inv, dtype=np.float64)
+        self.local_to_basis_array = np.array(self.local_to_basis, dtype=np.float64)
+        self.basis_to_local_array = np.array(self.basis_to_local, dtype=np.float64)
+
+
+class ArmatureCache:
+    """Bone lookups and rest pose data of an armature, built once and shared by all actions"""
+
+    def __init__(self, arm):
+        self.bones_num = len(arm.bones)
+        self.bones_by_name = {}
+        self.bones_by_id = {}
+
+        # Armatures with equal fingerprints give equal retarget results
+        fingerprint = hashlib.sha1()
+
+        for bone in arm.bones:
+            rest = BoneRest(bone)
+            self.bones_by_name[rest.name] = rest
+            if rest.bone_id is not None:
+                self.bones_by_id.setdefault(rest.bone_id, rest)
+
+            fingerprint.update(repr((rest.name, rest.bone_id, rest.parent_name, rest.rest_hash)).encode())
+
+        self.fingerprint = fingerprint.hexdigest()
+
+    def is_valid(self, arm):
+        return len(arm.bones) == self.bones_num and all(b.name in self.bones_by_name for b in arm.bones)
+
+    def find_bone(self, bone_name, bone_id=None):
+        """Find a bone by its IFP id and fall back to its name"""
+        rest = None
+        if bone_id is not None and bone_id != -1:
+            rest = self.bones_by_id.get(bone_id)
+        if not rest:
+            rest = self.bones_by_name.get(bone_name)
+        return rest
+
+
+_armature_caches = {}
+
+
+def get_armature_cache(arm_obj, refresh=False):
+    """Return the cache of an armature, refresh rebuilds it to pick up rest pose changes"""
+    arm = arm_obj.data
+    key = arm.as_pointer()
+
+    cache = _armature_caches.get(key)
+    if refresh or cache is None or not cache.is_valid(arm):
+        cache = _armature_caches[key] = ArmatureCache(arm)
+    return cache
+
+
+def clear_armature_caches():
+    _armature_caches.clear()
+
+
+@persistent
+def invalidate_armature_caches(scene, depsgraph):
+    """Drop the caches of armatures edited since the last update"""
+    if not _armature_caches:
+        return
+
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Armature):
+            _armature_caches.pop(update.id.original.as_pointer(), None)
+
+
+@persistent
+def clear_armature_caches_on_load(dummy):
+    clear_armature_caches()
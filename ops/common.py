@@ -1,18 +1,81 @@
-from mathutils import Matrix
+import bpy
+import numpy as np
 
 
-def set_keyframe(curves, frame, values):
+# Value of the 'LINEAR' item of Keyframe.interpolation for foreach_set
+INTERPOLATION_LINEAR = 1
+
+
+def set_keyframes(curves, frames, values):
+    """Fill empty curves with all keyframes at once, values holds a column per curve"""
+    keyframes_num = len(frames)
+    co = np.empty((keyframes_num, 2), dtype=np.float32)
+    co[:, 0] = frames
+    interpolation = np.full(keyframes_num, INTERPOLATION_LINEAR, dtype=np.int32)
+
     for i, c in enumerate(curves):
-        c.keyframe_points.add(1)
-        c.keyframe_points[-1].co = frame, values[i]
-        c.keyframe_points[-1].interpolation = 'LINEAR'
+        co[:, 1] = values[:, i]
+        c.keyframe_points.add(keyframes_num)
+        c.keyframe_points.foreach_set('co', co.ravel())
+        c.keyframe_points.foreach_set('interpolation', interpolation)
+        c.update()
+
+
+def quat_multiply(a, b):
+    """Products of (w, x, y, z) quaternion arrays"""
+    aw, ax, ay, az = np.moveaxis(a, -1, 0)
+    bw, bx, by, bz = np.moveaxis(b, -1, 0)
+    return np.stack((
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+    ), axis=-1)
+
+
+def quat_rotation_difference(a, b):
+    """Quaternion.rotation_difference over arrays: inverted a multiplied by b"""
+    a_inv = a * np.array((1.0, -1.0, -1.0, -1.0)) / np.sum(a * a, axis=-1, keepdims=True)
+    return quat_multiply(a_inv, b)
+
+
+def make_quats_continuous(quats):
+    """Negate quaternions that are farther from the previous result than their negation"""
+    keyframes_num = len(quats)
+    if keyframes_num < 2:
+        return quats
+
+    dots = np.sum(quats[1:] * quats[:-1], axis=1)
+    flips = np.ones(keyframes_num)
+    flips[1:][dots < 0.0] = -1.0
+    signs = np.cumprod(flips)
+
+    # A quaternion orthogonal to the previous one is kept as is and restarts the sign chain
+    restarts = np.zeros(keyframes_num, dtype=np.intp)
+    restarts[1:] = np.where(dots == 0.0, np.arange(1, keyframes_num), 0)
+    signs *= signs[np.maximum.accumulate(restarts)]
+
+    return quats * signs[:, None]
+
+
+def transform_locations(mat, locs):
+    """Translations of mat @ Matrix.Translation(loc) for an array of locations"""
+    return locs @ mat[:3, :3].T + mat[:3, 3]
+
 
+def transform_scales(mat, scls):
+    """Matrix.to_scale() of mat @ Matrix.Diagonal(scl).to_4x4() for an array of scales"""
+    mat3 = mat[:3, :3]
+    res = np.abs(scls) * np.linalg.norm(mat3, axis=0)
+    res[np.linalg.det(mat3) * np.prod(scls, axis=1) < 0.0] *= -1.0
+    return res
 
-def translation_matrix(v):
-    return Matrix.Translation(v)
 
+def count_action_fcurves(act):
+    if bpy.app.version < (4, 4, 0):
+        return len(act.fcurves)
 
-def scale_matrix(v):
-    mat = Matrix.Identity(4)
-    mat[0][0], mat[1][1], mat[2][2] = v[0], v[1], v[2]
-    return mat
+    return sum(len(channelbag.fcurves)
+               for layer in act.layers
+               for strip in layer.strips
+               for channelbag in strip.channelbags)
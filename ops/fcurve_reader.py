@@ -0,0 +1,146 @@
+import numpy as np
+
+from collections import defaultdict
+
+from .common import quat_multiply
+
+
+CHANNEL_DEFAULTS = {
+    'location': (0.0, 0.0, 0.0),
+    'rotation_quaternion': (1.0, 0.0, 0.0, 0.0),
+    'rotation_euler': (0.0, 0.0, 0.0),
+    'scale': (1.0, 1.0, 1.0),
+}
+
+# Values the exporter writes for components without a key in a frame, the defaults
+# of the mathutils types it has always collected keyframes in, zero scales included
+FRAME_DEFAULTS = {
+    'location': (0.0, 0.0, 0.0),
+    'rotation_quaternion': (1.0, 0.0, 0.0, 0.0),
+    'rotation_euler': (0.0, 0.0, 0.0),
+    'scale': (0.0, 0.0, 0.0),
+}
+
+IFP_CHANNELS = {
+    'R': 'rotation_quaternion',
+    'T': 'location',
+    'S': 'scale',
+}
+
+POSEDATA_PATH_START = 'pose.bones["'
+
+
+def read_keyframes(curve):
+    """Keyframe times and values of a curve read with a single foreach_get"""
+    kps = curve.keyframe_points
+    co = np.empty(len(kps) * 2, dtype=np.float32)
+    kps.foreach_get('co', co)
+    co = co.astype(np.float64)
+    return co[0::2], co[1::2]
+
+
+def parse_ifp_data_path(data_path):
+    """Bone name, bone id and channel of an 'ifp//name//id//R|T|S' data path"""
+    _, bone_name, bone_id, movement = data_path.split('//')
+    bone_id = int(bone_id) if bone_id != 'None' else None
+    return bone_name, bone_id, IFP_CHANNELS.get(movement)
+
+
+def parse_pose_data_path(data_path):
+    """Bone name and channel of a 'pose.bones["name"].channel' data path"""
+    if not data_path.startswith(POSEDATA_PATH_START):
+        return None, None
+
+    bone_name, sep, channel = data_path[len(POSEDATA_PATH_START):].rpartition('"].')
+    if not sep or channel not in CHANNEL_DEFAULTS:
+        return None, None
+
+    return bone_name.replace('\\"', '"'), channel
+
+
+def euler_to_quaternion(eulers, order='XYZ'):
+    """Euler.to_quaternion() over an array of (x, y, z) angles"""
+    half = eulers * 0.5
+    cos, sin = np.cos(half), np.sin(half)
+
+    axis_quats = {}
+    for i, axis in enumerate('XYZ'):
+        q = np.zeros((len(eulers), 4))
+        q[:, 0] = cos[:, i]
+        q[:, i + 1] = sin[:, i]
+        axis_quats[axis] = q
+
+    # The first axis of the order is applied first
+    return quat_multiply(quat_multiply(axis_quats[order[2]], axis_quats[order[1]]), axis_quats[order[0]])
+
+
+class BoneChannels:
+    """Keyframes of the transform channels of one bone, read curve by curve"""
+
+    __slots__ = ('curves',)
+
+    def __init__(self):
+        self.curves = defaultdict(dict)
+
+    def __contains__(self, channel):
+        return channel in self.curves
+
+    def add_curve(self, channel, curve):
+        self.curves[channel][curve.array_index] = read_keyframes(curve)
+
+    def update_hash(self, content_hash):
+        for channel in sorted(self.curves):
+            for index, (times, values) in sorted(self.curves[channel].items()):
+                content_hash.update(f'{channel}[{index}]'.encode())
+                content_hash.update(times.tobytes())
+                content_hash.update(values.tobytes())
+
+    def get_times(self, *channels):
+        """Sorted keyframe times of the channels, all channels if none are given"""
+        channels = channels or self.curves.keys()
+        times = [t for ch in channels for t, _ in self.curves.get(ch, {}).values()]
+        if not times:
+            return np.empty(0)
+        return np.unique(np.concatenate(times))
+
+    def get_frames(self):
+        """Sorted whole frames of the keys of all channels"""
+        return np.unique(np.trunc(self.get_times()))
+
+    def get_frame_values(self, channel, frames):
+        """Channel values at whole frames, the last key of a frame wins and components
+        without a key in a frame get their default"""
+        defaults = FRAME_DEFAULTS[channel]
+        values = np.empty((len(frames), len(defaults)))
+        curves = self.curves.get(channel, {})
+
+        for i, default in enumerate(defaults):
+            values[:, i] = default
+            keys = curves.get(i)
+            if keys is None or not len(keys[0]):
+                continue
+
+            # Unique frames of the reversed keys come from the last key of each frame
+            key_frames, index = np.unique(np.trunc(keys[0][::-1]), return_index=True)
+            pos = np.minimum(np.searchsorted(key_frames, frames), len(key_frames) - 1)
+            found = key_frames[pos] == frames
+            values[found, i] = keys[1][::-1][index[pos[found]]]
+
+        return values
+
+    def get_values(self, channel, times):
+        """Channel values at the given times, keys missing on a curve are interpolated"""
+        defaults = CHANNEL_DEFAULTS[channel]
+        values = np.empty((len(times), len(defaults)))
+        curves = self.curves.get(channel, {})
+
+        for i, default in enumerate(defaults):
+            keys = curves.get(i)
+            if keys is None or not len(keys[0]):
+                values[:, i] = default
+            elif np.array_equal(keys[0], times):
+                values[:, i] = keys[1]
+            else:
+                values[:, i] = np.interp(times, keys[0], keys[1])
+
+        return values
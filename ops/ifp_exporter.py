@@ -2,33 +2,25 @@ import bpy
 
 from bpy_extras import anim_utils
 from dataclasses import dataclass
-from mathutils import Euler, Matrix, Quaternion, Vector
 from typing import Dict, List
 
-from .common import translation_matrix, scale_matrix
-from ..gtaLib.ifp import Keyframe
-
-@dataclass
-class Transformation:
-    location:            Vector
-    rotation_quaternion: Quaternion
-    rotation_euler:      Euler
-    scale:               Vector
+from .armature_cache import BoneRest, get_armature_cache
+from .common import quat_rotation_difference, transform_locations, transform_scales
+from .fcurve_reader import BoneChannels, euler_to_quaternion, parse_ifp_data_path, parse_pose_data_path
+from .keyframe_reducer import to_float_array
+from .proxy_action import create_proxy_animation
+from ..gtaLib.ifp import KeyframeTrack
 
 
 @dataclass
 class PoseData:
     bone_id:        int
-    bone:           bpy.types.PoseBone
-    transfomations: Dict[int, Transformation]
+    bone:           BoneRest
+    channels:       BoneChannels
     type:           List[str]
     overridden:     bool
 
 
-def basis_to_local_matrix(basis_matrix, global_matrix, parent_matrix):
-    return parent_matrix.inverted() @ global_matrix @ basis_matrix
-
-
 def get_action_channelbag(act, obj=None):
     obj_active_slot = obj.animation_data.action_slot if obj else None
 
@@ -41,9 +33,12 @@ def get_action_channelbag(act, obj=None):
     return anim_utils.action_get_channelbag_for_slot(act, slot)
 
 
-def get_pose_data(arm_obj, act) -> Dict[str, PoseData]:
+def get_pose_data(arm_obj, act, cache=None) -> Dict[str, PoseData]:
     pose_data: Dict[str, PoseData] = {}
 
+    if arm_obj and cache is None:
+        cache = get_armature_cache(arm_obj)
+
     if bpy.app.version < (4, 4, 0):
         groups = act.groups
         fcurves = act.fcurves
@@ -66,15 +61,15 @@ def get_pose_data(arm_obj, act) -> Dict[str, PoseData]:
             if curve.group == ifp_group:
                 continue
 
-            if 'pose.bones' not in curve.data_path:
+            bone_name, channel = parse_pose_data_path(curve.data_path)
+            if not channel:
                 continue
 
-            bone_name = curve.data_path.split('"')[1]
-            bone = arm_obj.data.bones.get(bone_name)
+            bone = cache.bones_by_name.get(bone_name)
             if not bone:
                 continue
 
-            bone_id = bone.get('bone_id')
+            bone_id = bone.bone_id
             if bone_id is None:
                 continue
 
@@ -82,47 +77,28 @@ def get_pose_data(arm_obj, act) -> Dict[str, PoseData]:
 
             pd = taged_bones_map.get(bone_key)
             if pd is None:
-                pd = PoseData(
+                pd = taged_bones_map[bone_key] = PoseData(
                     bone_id=bone_id,
                     bone=bone,
-                    transfomations={},
+                    channels=BoneChannels(),
                     type=['K', 'R', '0', '0'],
                     overridden=False,
                 )
 
-            for kp in curve.keyframe_points:
-                time = int(kp.co[0])
-                if time not in pd.transfomations:
-                    pd.transfomations[time] = Transformation(
-                        location=Vector(),
-                        rotation_quaternion=Quaternion(),
-                        rotation_euler=Euler(),
-                        scale=Vector())
-
-                if curve.data_path == f'pose.bones["{bone_name}"].location':
-                    pd.transfomations[time].location[curve.array_index] = kp.co[1]
-                    pd.type[2] = 'T'
-
-                elif curve.data_path == f'pose.bones["{bone_name}"].rotation_quaternion':
-                    pd.transfomations[time].rotation_quaternion[curve.array_index] = kp.co[1]
-
-                elif curve.data_path == f'pose.bones["{bone_name}"].rotation_euler':
-                    pd.transfomations[time].rotation_euler[curve.array_index] = kp.co[1]
-
-                elif curve.data_path == f'pose.bones["{bone_name}"].scale':
-                    pd.transfomations[time].scale[curve.array_index] = kp.co[1]
-                    pd.type[3] = 'S'
-
-            taged_bones_map[bone_key] = pd
+            pd.channels.add_curve(channel, curve)
+            if channel == 'location':
+                pd.type[2] = 'T'
+            elif channel == 'scale':
+                pd.type[3] = 'S'
 
     # Merge with IFP stored keyframes
     for curve in fcurves:
         if curve.group != ifp_group:
             continue
 
-        _, bone_name, bone_id, movement = curve.data_path.split('//')
-        use_bone_id = bone_id != 'None'
-        bone_id = int(bone_id) if use_bone_id else -1
+        bone_name, bone_id, channel = parse_ifp_data_path(curve.data_path)
+        if bone_id is None:
+            bone_id = -1
         bone_key = bone_id if bone_id != -1 else bone_name
 
         pd = taged_bones_map.get(bone_key)
@@ -133,35 +109,19 @@ def get_pose_data(arm_obj, act) -> Dict[str, PoseData]:
 
         pd = pose_data.get(bone_name)
         if pd is None:
-            pd = PoseData(
+            pd = pose_data[bone_name] = PoseData(
                 bone_id=bone_id,
                 bone=None,
-                transfomations={},
+                channels=BoneChannels(),
                 type=['K', 'R', '0', '0'],
                 overridden=True,
             )
 
-        for kp in curve.keyframe_points:
-            time = int(kp.co[0])
-            if time not in pd.transfomations:
-                pd.transfomations[time] = Transformation(
-                    location=Vector(),
-                    rotation_quaternion=Quaternion(),
-                    rotation_euler=Euler(),
-                    scale=Vector())
-
-            if movement == 'L':
-                pd.transfomations[time].location[curve.array_index] = kp.co[1]
-                pd.type[2] = 'T'
-
-            elif movement == 'R':
-                pd.transfomations[time].rotation_quaternion[curve.array_index] = kp.co[1]
-
-            elif movement == 'S':
-                pd.transfomations[time].scale[curve.array_index] = kp.co[1]
-                pd.type[3] = 'S'
-
-        pose_data[bone_name] = pd
+        pd.channels.add_curve(channel, curve)
+        if channel == 'location':
+            pd.type[2] = 'T'
+        elif channel == 'scale':
+            pd.type[3] = 'S'
 
     # Merge with remaining active keyframes
     for pd in taged_bones_map.values():
@@ -171,12 +131,17 @@ def get_pose_data(arm_obj, act) -> Dict[str, PoseData]:
     return pose_data
 
 
-def create_ifp_animations(context, ifp_cls, actions, fps):
+def create_ifp_animations(context, ifp_cls, actions, fps, reducer=None):
+    """Yield one IFP animation per action, each is converted only when requested"""
+
     anim_cls = ifp_cls.get_animation_class()
     bone_cls = anim_cls.get_bone_class()
-    animations = []
 
     for act in actions:
+        if act.ifp.is_proxy:
+            yield create_proxy_animation(act, ifp_cls, fps, reducer)
+            continue
+
         arm_obj = act.ifp.target_armature
 
         if bpy.app.version < (4, 4, 0):
@@ -193,41 +158,40 @@ def create_ifp_animations(context, ifp_cls, actions, fps):
                 arm_obj = None
 
         anim = anim_cls(act.name, [])
-        pose_data = get_pose_data(arm_obj, act)
+        cache = get_armature_cache(arm_obj) if arm_obj else None
+        pose_data = get_pose_data(arm_obj, act, cache)
 
         for bone_name, data in pose_data.items():
             bone = data.bone
+            channels = data.channels
+
+            # Keyframes are taken at whole frames
+            frames = channels.get_frames()
+            kf_pos = channels.get_frame_values('location', frames)
+            kf_scl = channels.get_frame_values('scale', frames)
+
+            rotation_mode = arm_obj.pose.bones[bone.name].rotation_mode if bone else 'QUATERNION'
+            if rotation_mode == 'QUATERNION':
+                kf_rot = channels.get_frame_values('rotation_quaternion', frames)
+            else:
+                order = rotation_mode if len(rotation_mode) == 3 else 'XYZ'
+                kf_rot = euler_to_quaternion(channels.get_frame_values('rotation_euler', frames), order)
+
             if bone:
-                rest_mat = bone.matrix_local
-                if bone.parent:
-                    parent_mat = bone.parent.matrix_local
-                    local_rot = (parent_mat.inverted_safe() @ rest_mat).to_quaternion()
-                else:
-                    parent_mat = Matrix.Identity(4)
-                    local_rot = rest_mat.to_quaternion()
-
-            keyframes = []
-            for time, tr in data.transfomations.items():
-                kf_pos = tr.location
-                if bone and arm_obj.pose.bones[bone.name].rotation_mode == 'QUATERNION':
-                    kf_rot = tr.rotation_quaternion
-                else:
-                    kf_rot = tr.rotation_euler.to_quaternion()
-                kf_scl = tr.scale
-
-                if bone:
-                    basis_mat = translation_matrix(kf_pos) @ scale_matrix(kf_scl)
-                    local_mat = basis_to_local_matrix(basis_mat, rest_mat, parent_mat)
-
-                    kf_pos = local_mat.to_translation()
-                    kf_rot = local_rot.inverted().rotation_difference(kf_rot)
-                    kf_scl = local_mat.to_scale()
-
-                kf = Keyframe(time / fps, kf_pos, kf_rot, kf_scl)
-                keyframes.append(kf)
+                kf_pos = transform_locations(bone.basis_to_local_array, kf_pos)
+                kf_rot = quat_rotation_difference(bone.local_rot_inv_array, kf_rot)
+                kf_scl = transform_scales(bone.basis_to_local_array, kf_scl)
+
+            keyframes = KeyframeTrack(
+                to_float_array(frames / fps),
+                to_float_array(kf_rot.ravel()),
+                to_float_array(kf_pos.ravel()),
+                to_float_array(kf_scl.ravel()),
+            )
 
             anim.bones.append(bone_cls(bone_name, ''.join(data.type), True, data.bone_id, 0, 0, keyframes))
 
-        animations.append(anim)
+        if reducer:
+            anim = reducer.reduce_animation(anim)
 
-    return animations
+        yield anim
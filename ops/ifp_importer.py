@@ -1,18 +1,20 @@
 import bpy
+import numpy as np
 
-from .common import set_keyframe
+from .common import set_keyframes
 from ..gtaLib.ifp import Animation
 
 
-def create_action(anim:Animation, fps:float):
-    act = bpy.data.actions.new(anim.name)
+def create_action(anim:Animation, fps:float, act=None):
+    if act is None:
+        act = bpy.data.actions.new(anim.name)
 
     if bpy.app.version < (4, 4, 0):
         group = act.groups.new(name='ifp')
         fcurves = act.fcurves
 
     else:
-        slot = act.slots.new(id_type='OBJECT', name='IFP')
+        slot = act.slots.get('OBIFP') or act.slots.new(id_type='OBJECT', name='IFP')
         layer = act.layers.new('Layer')
         strip = layer.strips.new(type='KEYFRAME')
         channelbag = strip.channelbag(slot, ensure=True)
@@ -51,15 +53,76 @@ def create_action(anim:Animation, fps:float):
                 c.mute = c.lock = True
                 c.group = group
 
-        for kf in b.keyframes:
-            time = kf.time * fps
+        # Fill every curve straight from the decoded keyframe arrays
+        kfs = b.keyframes
+        frames = np.frombuffer(kfs.times, dtype=np.float32) * fps
 
-            if has_location:
-                set_keyframe(cl, time, kf.pos)
+        if has_location:
+            set_keyframes(cl, frames, np.frombuffer(kfs.get_poss(), dtype=np.float32).reshape(-1, 3))
 
-            if has_scale:
-                set_keyframe(cs, time, kf.scl)
+        if has_scale:
+            set_keyframes(cs, frames, np.frombuffer(kfs.get_scls(), dtype=np.float32).reshape(-1, 3))
 
-            set_keyframe(cr, time, kf.rot)
+        set_keyframes(cr, frames, np.frombuffer(kfs.rots, dtype=np.float32).reshape(-1, 4))
 
     return act
+
+
+def clear_action(act):
+    """Remove all fcurves of an action, slots are kept for the users of the action"""
+    if bpy.app.version < (4, 4, 0):
+        for c in list(act.fcurves):
+            act.fcurves.remove(c)
+        for group in list(act.groups):
+            act.groups.remove(group)
+
+    else:
+        for layer in list(act.layers):
+            act.layers.remove(layer)
+
+
+def replace_action(act, new_act):
+    """Move the users, the fake user and the name of an action to another action"""
+    name, use_fake_user = act.name, act.use_fake_user
+    act.use_fake_user = False
+    act.user_remap(new_act)
+
+    act.name = new_act.name
+    new_act.name = name
+    new_act.use_fake_user = use_fake_user
+
+
+ACTION_SOURCE_PROPS = (
+    'source_path',
+    'source_name',
+    'source_version',
+    'source_offset',
+    'source_size',
+    'source_fps',
+    'content_hash',
+    'materialize_error',
+)
+
+
+def get_action_source(act):
+    """Snapshot of the source properties of an action for restore_action_source"""
+    return {name: getattr(act.ifp, name) for name in ACTION_SOURCE_PROPS}
+
+
+def restore_action_source(act, source):
+    for name, value in source.items():
+        setattr(act.ifp, name, value)
+
+
+def set_action_source(act, filepath, version, entry, content_hash, fps):
+    """Record which animation of which file an action was imported from"""
+    props = act.ifp
+    props.source_path = filepath
+    props.source_name = entry.name
+    props.source_version = version
+    props.source_offset = entry.offset
+    props.source_size = entry.size
+    props.source_fps = fps
+    props.content_hash = content_hash
+    # A new source gets another chance to be loaded
+    props.materialize_error = ''
@@ -0,0 +1,105 @@
+import numpy as np
+
+from array import array
+
+from ..gtaLib.ifp import KeyframeTrack
+
+
+def slerp(q0, q1, t):
+    dot = np.dot(q0, q1)
+    if dot < 0.0:
+        q1 = -q1
+        dot = -dot
+
+    if dot > 0.9995:
+        res = q0 + t[:, None] * (q1 - q0)
+        return res / np.linalg.norm(res, axis=1)[:, None]
+
+    theta = np.arccos(dot)
+    sin_theta = np.sin(theta)
+    w0 = np.sin((1.0 - t) * theta) / sin_theta
+    w1 = np.sin(t * theta) / sin_theta
+    return w0[:, None] * q0 + w1[:, None] * q1
+
+
+def lerp(v0, v1, t):
+    return v0 + t[:, None] * (v1 - v0)
+
+
+def to_float_array(values):
+    return array('f', values.astype(np.float32).tobytes())
+
+
+class KeyframeReducer:
+    """Drops keyframes that interpolation of their neighbours rebuilds within tolerances.
+
+    Rotations are checked with slerp against angle_tolerance (radians),
+    translations and scales with lerp against location_tolerance.
+    """
+
+    def __init__(self, angle_tolerance, location_tolerance):
+        self.angle_tolerance = max(angle_tolerance, 1e-9)
+        self.location_tolerance = max(location_tolerance, 1e-9)
+        self.results = []
+
+    def get_segment_error(self, i, j, times, rots, poss, scls):
+        """Error of the keyframes between i and j relative to the tolerances"""
+        dt = times[j] - times[i]
+        t = (times[i+1:j] - times[i]) / dt if dt > 0 else np.zeros(j - i - 1)
+
+        q = slerp(rots[i], rots[j], t)
+        dot = np.abs(np.sum(q * rots[i+1:j], axis=1))
+        dot /= np.linalg.norm(q, axis=1) * np.linalg.norm(rots[i+1:j], axis=1)
+        err = 2.0 * np.arccos(np.clip(dot, 0.0, 1.0)) / self.angle_tolerance
+
+        for values in (poss, scls):
+            if values is not None:
+                dist = np.linalg.norm(lerp(values[i], values[j], t) - values[i+1:j], axis=1)
+                err = np.maximum(err, dist / self.location_tolerance)
+
+        return err
+
+    def reduce_track(self, track):
+        keyframes_num = len(track)
+        if keyframes_num < 3:
+            return track
+
+        times = np.frombuffer(track.times, dtype=np.float32).astype(np.float64)
+        order = np.argsort(times, kind='stable')
+        times = times[order]
+        rots = np.frombuffer(track.rots, dtype=np.float32).reshape(-1, 4)[order].astype(np.float64)
+        poss = np.frombuffer(track.poss, dtype=np.float32).reshape(-1, 3)[order].astype(np.float64) \
+            if track.poss else None
+        scls = np.frombuffer(track.scls, dtype=np.float32).reshape(-1, 3)[order].astype(np.float64) \
+            if track.scls else None
+
+        # Split segments at the worst keyframe until every segment is within tolerances
+        keep = np.zeros(keyframes_num, dtype=bool)
+        keep[0] = keep[-1] = True
+        segments = [(0, keyframes_num - 1)]
+        while segments:
+            i, j = segments.pop()
+            if j - i < 2:
+                continue
+
+            err = self.get_segment_error(i, j, times, rots, poss, scls)
+            k = int(np.argmax(err))
+            if err[k] > 1.0:
+                k += i + 1
+                keep[k] = True
+                segments += [(i, k), (k, j)]
+
+        return KeyframeTrack(
+            to_float_array(times[keep]),
+            to_float_array(rots[keep].ravel()),
+            to_float_array(poss[keep].ravel()) if poss is not None else (),
+            to_float_array(scls[keep].ravel()) if scls is not None else (),
+        )
+
+    def reduce_animation(self, anim):
+        size = anim.get_size()
+        for b in anim.bones:
+            b.keyframes = self.reduce_track(b.keyframes)
+
+        self.results.append((anim.name, size, anim.get_size()))
+        return anim
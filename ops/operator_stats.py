@@ -0,0 +1,83 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import tempfile
+import time
+
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+def get_stats_dir():
+    return os.path.join(tempfile.gettempdir(), 'io_scene_gta_ifp')
+
+
+class OperatorStats:
+    """Per-stage timings and counters of an import/export run, with optional cProfile capture"""
+
+    def __init__(self, operation, filepath, use_profile=False):
+        self.operation = operation
+        self.filepath = filepath
+        self.timings = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.profile = cProfile.Profile() if use_profile else None
+        self.start_time = time.perf_counter()
+        self.total_time = 0.0
+
+        if self.profile:
+            self.profile.enable()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - start
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def finish(self):
+        self.total_time = time.perf_counter() - self.start_time
+        if self.profile:
+            self.profile.disable()
+
+    def to_dict(self):
+        return {
+            'operation': self.operation,
+            'filepath': self.filepath,
+            'time': time.time(),
+            'total_s': self.total_time,
+            'stages_s': dict(self.timings),
+            'counters': dict(self.counters),
+        }
+
+    def format_lines(self):
+        lines = [f'Total: {self.total_time:.3f} s']
+        lines += [f'{name}: {t:.3f} s' for name, t in self.timings.items()]
+        lines += [f'{name}: {n}' for name, n in self.counters.items()]
+        return lines
+
+    def write_log(self):
+        """Append the stats as a JSON line to the stats log, dump and print the profile if captured"""
+        stats_dir = get_stats_dir()
+        os.makedirs(stats_dir, exist_ok=True)
+
+        log_path = os.path.join(stats_dir, 'stats.jsonl')
+        with open(log_path, 'a', encoding='utf-8') as fd:
+            fd.write(json.dumps(self.to_dict()) + '\n')
+
+        if self.profile:
+            profile_path = os.path.join(stats_dir, f'{self.operation}.prof')
+            self.profile.dump_stats(profile_path)
+
+            out = io.StringIO()
+            pstats.Stats(self.profile, stream=out).sort_stats('cumulative').print_stats(20)
+            print(out.getvalue())
+            print(f'IFP {self.operation} profile: {profile_path}')
+            print(f'IFP {self.operation} stats: {log_path}')
+
+        return log_path
@@ -0,0 +1,156 @@
+import bpy
+
+from bpy.app.handlers import persistent
+
+from .action_retargeter import retarget_action
+from .ifp_importer import create_action, set_action_source
+from ..gtaLib.ifp import ANIM_CLASSES, Anp3Animation, Ifp, RawAnimation, get_content_hash, transcode_animation
+
+
+def create_proxy_action(filepath, version, entry, content_hash, fps):
+    """Create an empty action that records where its animation is stored"""
+    act = bpy.data.actions.new(entry.name)
+    set_action_source(act, filepath, version, entry, content_hash, fps)
+    act.ifp.is_proxy = True
+    return act
+
+
+def read_proxy_data(act):
+    """Raw bytes of the animation of a proxy action, checked against the stored hash"""
+    props = act.ifp
+    filepath = bpy.path.abspath(props.source_path)
+
+    with open(filepath, 'rb') as fd:
+        fd.seek(props.source_offset)
+        data = fd.read(props.source_size)
+
+    if len(data) != props.source_size or get_content_hash(data) != props.content_hash:
+        raise Exception(f'Animation of "{act.name}" has changed in {filepath}')
+
+    return data
+
+
+def materialize_action(act, arm_obj=None, cache=None):
+    """Build the keyframes of a proxy action and retarget them to an armature"""
+    props = act.ifp
+    anim = Ifp.decode_animation(props.source_version, read_proxy_data(act))
+
+    create_action(anim, props.source_fps, act)
+    props.is_proxy = False
+    props.materialize_error = ''
+
+    if arm_obj:
+        return retarget_action(act, arm_obj, cache)
+    return set()
+
+
+def create_proxy_animation(act, ifp_cls, fps, reducer=None):
+    """IFP animation of an untouched proxy action, the original bytes are kept if possible"""
+    props = act.ifp
+    data = read_proxy_data(act)
+
+    src_cls = ANIM_CLASSES[props.source_version]
+    if src_cls is ifp_cls and not reducer:
+        if act.name == props.source_name:
+            return RawAnimation(act.name, data)
+
+        # Renamed proxies keep their data if the name can be patched in place
+        if props.source_version == 'ANP3':
+            return RawAnimation(act.name, Anp3Animation.rename_raw(data, act.name))
+
+    anim = Ifp.decode_animation(props.source_version, data)
+    anim.name = act.name
+    if src_cls is not ifp_cls:
+        # Keyframe times are scaled between ANPK seconds and ANP3 frames
+        anim = transcode_animation(anim, ifp_cls, fps if props.source_version == 'ANP3' else props.source_fps)
+
+    if reducer:
+        anim = reducer.reduce_animation(anim)
+
+    return anim
+
+
+# Names of the objects whose proxy actions wait for materialize_pending_actions
+pending_objects = set()
+
+
+def materialize_action_safe(act, arm_obj=None, cache=None):
+    """Materialize a proxy action, failures are stored in the action and returned"""
+    try:
+        return materialize_action(act, arm_obj, cache), None
+    except Exception as e:
+        act.ifp.materialize_error = str(e)
+        return set(), act.ifp.materialize_error
+
+
+def show_report(**props):
+    """Show the import report from a timer, which runs without a window"""
+    windows = bpy.context.window_manager.windows
+    if not windows:
+        return
+
+    if bpy.app.version >= (3, 2, 0):
+        with bpy.context.temp_override(window=windows[0]):
+            bpy.ops.message.ifp_import_report('INVOKE_DEFAULT', **props)
+    else:
+        bpy.ops.message.ifp_import_report({'window': windows[0]}, 'INVOKE_DEFAULT', **props)
+
+
+def materialize_pending_actions():
+    """Timer callback materializing the proxy actions assigned since the last call"""
+    missing_bones = set()
+    errors = []
+
+    while pending_objects:
+        obj = bpy.data.objects.get(pending_objects.pop())
+        animation_data = obj.animation_data if obj else None
+        act = animation_data.action if animation_data else None
+        if not act or not act.ifp.is_proxy or act.ifp.materialize_error:
+            continue
+
+        arm_obj = obj if type(obj.data) == bpy.types.Armature else None
+        mb, error = materialize_action_safe(act, arm_obj)
+        if error:
+            errors.append(f'{act.name}: {error}')
+            continue
+
+        if bpy.app.version >= (4, 4, 0) and not animation_data.action_slot:
+            animation_data.action_slot = act.slots[-1]
+
+        missing_bones.update(mb)
+
+    if errors or missing_bones:
+        show_report(missing_bones_message='\n'.join(sorted(missing_bones)), failed_actions_message='\n'.join(errors))
+
+    # Not repeated, the next assignment registers the timer again
+    return None
+
+
+@persistent
+def queue_assigned_actions(scene, depsgraph):
+    """Queue the proxy actions assigned to objects, ID data can not be changed from this handler"""
+    for update in depsgraph.updates:
+        if not isinstance(update.id, bpy.types.Object):
+            continue
+
+        obj = update.id.original
+        animation_data = obj.animation_data
+        act = animation_data.action if animation_data else None
+        if not act or not act.ifp.is_proxy or act.ifp.materialize_error:
+            continue
+
+        pending_objects.add(obj.name)
+
+    if pending_objects and not bpy.app.timers.is_registered(materialize_pending_actions):
+        bpy.app.timers.register(materialize_pending_actions)
+
+
+def clear_pending_actions():
+    if bpy.app.timers.is_registered(materialize_pending_actions):
+        bpy.app.timers.unregister(materialize_pending_actions)
+    pending_objects.clear()
+
+
+@persistent
+def clear_pending_actions_on_load(*args):
+    clear_pending_actions()
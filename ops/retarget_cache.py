@@ -0,0 +1,54 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+# Number of retargeted actions kept in memory
+RETARGET_CACHE_SIZE = 256
+
+
+@dataclass
+class BoneTracks:
+    """Pose space keyframes of one bone, each track holds keyframe times and values"""
+    __slots__ = ('group_name', 'bone_name', 'rest_hash', 'rots', 'locs', 'scls')
+
+    group_name: str
+    bone_name: str
+    rest_hash: str
+    rots: Tuple[np.ndarray, np.ndarray]
+    locs: Optional[Tuple[np.ndarray, np.ndarray]]
+    scls: Optional[Tuple[np.ndarray, np.ndarray]]
+
+
+class RetargetCache:
+    """Retarget results keyed by action content and skeleton fingerprint, least recently used are dropped"""
+
+    def __init__(self, max_size=RETARGET_CACHE_SIZE):
+        self.max_size = max_size
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        result = self.results.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+
+        self.results.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        self.results[key] = result
+        self.results.move_to_end(key)
+        while len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+
+    def clear(self):
+        self.results.clear()
+
+
+retarget_cache = RetargetCache()
@@ -0,0 +1,91 @@
+import importlib
+import importlib.machinery
+import importlib.util
+import os
+import sys
+
+import pytest
+
+try:
+    import bpy
+except ImportError:
+    # Only the tests of the Blender side of the add-on need it
+    bpy = None
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(TESTS_DIR)
+
+# gtaLib does not depend on Blender, the benchmarks provide the synthetic archives
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+sys.path.insert(0, TESTS_DIR)
+
+ADDON_PACKAGE = 'io_scene_gta_ifp'
+
+
+def import_addon_module(name=None):
+    """Import a module of the add-on, its __init__ only runs when bpy is available"""
+    if ADDON_PACKAGE not in sys.modules:
+        if bpy:
+            spec = importlib.util.spec_from_file_location(
+                ADDON_PACKAGE, os.path.join(ROOT_DIR, '__init__.py'), submodule_search_locations=[ROOT_DIR])
+        else:
+            spec = importlib.machinery.ModuleSpec(ADDON_PACKAGE, None, is_package=True)
+
+        package = importlib.util.module_from_spec(spec)
+        package.__path__ = [ROOT_DIR]
+        sys.modules[ADDON_PACKAGE] = package
+        if bpy:
+            spec.loader.exec_module(package)
+
+    return importlib.import_module(f'{ADDON_PACKAGE}.{name}' if name else ADDON_PACKAGE)
+
+
+@pytest.fixture(autouse=True)
+def toc_cache_dir(tmp_path, monkeypatch):
+    cache_dir = tmp_path / 'toc'
+    monkeypatch.setenv('IFP_TOC_CACHE_DIR', str(cache_dir))
+    return cache_dir
+
+
+
+@pytest.fixture
+def addon():
+    """The registered add-on in an empty file"""
+    if bpy is None:
+        pytest.skip('needs the bpy module of Blender')
+
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    addon = import_addon_module()
+    addon.register()
+    yield addon
+    addon.unregister()
+
+
+# Name, bone id, parent, head, tail and roll of the test armature bones
+ARMATURE_BONES = (
+    ('Root', 0, None, (0.0, 0.0, 0.0), (0.0, 0.1, 0.2), 0.3),
+    ('Spine', 1, 'Root', (0.0, 0.1, 0.2), (0.1, 0.0, 0.5), -0.7),
+    ('Head', 2, 'Spine', (0.1, 0.0, 0.5), (0.1, 0.2, 0.6), 1.1),
+)
+
+
+@pytest.fixture
+def armature(addon):
+    """Armature object with bone ids and rest poses that are not axis aligned"""
+    arm = bpy.data.armatures.new('ped')
+    arm_obj = bpy.data.objects.new('ped', arm)
+    bpy.context.collection.objects.link(arm_obj)
+    bpy.context.view_layer.objects.active = arm_obj
+
+    bpy.ops.object.mode_set(mode='EDIT')
+    for name, _, parent, head, tail, roll in ARMATURE_BONES:
+        bone = arm.edit_bones.new(name)
+        bone.head, bone.tail, bone.roll = head, tail, roll
+        bone.parent = arm.edit_bones[parent] if parent else None
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+    for name, bone_id, *_ in ARMATURE_BONES:
+        arm.bones[name]['bone_id'] = bone_id
+
+    return arm_obj
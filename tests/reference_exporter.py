@@ -0,0 +1,199 @@
+"""Keyframe-by-keyframe action export of the original add-on, used as the behavioural reference.
+
+With fixes the reference also has the export fixes made since: stored IFP translations
+are exported, IFP bones keep their rotations, Euler rotations use the rotation order of
+their pose bone, frames are sorted and other pose bone properties add no keyframes.
+"""
+
+import bpy
+
+from dataclasses import dataclass
+from mathutils import Euler, Matrix, Quaternion, Vector
+from typing import Dict, List
+
+from gtaLib.ifp import Keyframe
+
+
+@dataclass
+class Transformation:
+    location:            Vector
+    rotation_quaternion: Quaternion
+    rotation_euler:      Euler
+    scale:               Vector
+
+
+@dataclass
+class PoseData:
+    bone_id:        int
+    bone:           bpy.types.PoseBone
+    transfomations: Dict[int, Transformation]
+    type:           List[str]
+    overridden:     bool
+
+
+def translation_matrix(v):
+    return Matrix.Translation(v)
+
+
+def scale_matrix(v):
+    mat = Matrix.Identity(4)
+    mat[0][0], mat[1][1], mat[2][2] = v[0], v[1], v[2]
+    return mat
+
+
+def basis_to_local_matrix(basis_matrix, global_matrix, parent_matrix):
+    return parent_matrix.inverted() @ global_matrix @ basis_matrix
+
+
+def new_transformation():
+    return Transformation(location=Vector(), rotation_quaternion=Quaternion(), rotation_euler=Euler(), scale=Vector())
+
+
+def get_pose_data(arm_obj, act, fixes):
+    pose_data = {}
+
+    groups = act.groups
+    fcurves = act.fcurves
+    ifp_group = groups.get('ifp')
+
+    taged_bones_map = {}
+
+    if arm_obj:
+        for curve in fcurves:
+            if curve.group == ifp_group:
+                continue
+
+            if 'pose.bones' not in curve.data_path:
+                continue
+
+            bone_name = curve.data_path.split('"')[1]
+            channel = curve.data_path.rpartition('.')[2]
+            if fixes and channel not in ('location', 'rotation_quaternion', 'rotation_euler', 'scale'):
+                continue
+
+            bone = arm_obj.data.bones.get(bone_name)
+            if not bone:
+                continue
+
+            bone_id = bone.get('bone_id')
+            if bone_id is None:
+                continue
+
+            bone_key = bone_id if bone_id != -1 else bone_name
+
+            pd = taged_bones_map.get(bone_key)
+            if pd is None:
+                pd = PoseData(bone_id=bone_id, bone=bone, transfomations={}, type=['K', 'R', '0', '0'], overridden=False)
+
+            for kp in curve.keyframe_points:
+                time = int(kp.co[0])
+                if time not in pd.transfomations:
+                    pd.transfomations[time] = new_transformation()
+
+                if curve.data_path == f'pose.bones["{bone_name}"].location':
+                    pd.transfomations[time].location[curve.array_index] = kp.co[1]
+                    pd.type[2] = 'T'
+
+                elif curve.data_path == f'pose.bones["{bone_name}"].rotation_quaternion':
+                    pd.transfomations[time].rotation_quaternion[curve.array_index] = kp.co[1]
+
+                elif curve.data_path == f'pose.bones["{bone_name}"].rotation_euler':
+                    pd.transfomations[time].rotation_euler[curve.array_index] = kp.co[1]
+
+                elif curve.data_path == f'pose.bones["{bone_name}"].scale':
+                    pd.transfomations[time].scale[curve.array_index] = kp.co[1]
+                    pd.type[3] = 'S'
+
+            taged_bones_map[bone_key] = pd
+
+    for curve in fcurves:
+        if curve.group != ifp_group:
+            continue
+
+        _, bone_name, bone_id, movement = curve.data_path.split('//')
+        use_bone_id = bone_id != 'None'
+        bone_id = int(bone_id) if use_bone_id else -1
+        bone_key = bone_id if bone_id != -1 else bone_name
+
+        pd = taged_bones_map.get(bone_key)
+        if pd is not None:
+            pd.overridden = True
+            pose_data[bone_name] = pd
+            continue
+
+        pd = pose_data.get(bone_name)
+        if pd is None:
+            pd = PoseData(bone_id=bone_id, bone=None, transfomations={}, type=['K', 'R', '0', '0'], overridden=True)
+
+        for kp in curve.keyframe_points:
+            time = int(kp.co[0])
+            if time not in pd.transfomations:
+                pd.transfomations[time] = new_transformation()
+
+            if movement == ('T' if fixes else 'L'):
+                pd.transfomations[time].location[curve.array_index] = kp.co[1]
+                pd.type[2] = 'T'
+
+            elif movement == 'R':
+                pd.transfomations[time].rotation_quaternion[curve.array_index] = kp.co[1]
+
+            elif movement == 'S':
+                pd.transfomations[time].scale[curve.array_index] = kp.co[1]
+                pd.type[3] = 'S'
+
+        pose_data[bone_name] = pd
+
+    for pd in taged_bones_map.values():
+        if not pd.overridden:
+            pose_data[pd.bone.name] = pd
+
+    return pose_data
+
+
+def export_action(act, arm_obj, fps, fixes=False):
+    """Bones of the exported animation as (name, keyframe type, bone id, keyframes) tuples"""
+    bones = []
+
+    for bone_name, data in get_pose_data(arm_obj, act, fixes).items():
+        bone = data.bone
+        if bone:
+            rest_mat = bone.matrix_local
+            if bone.parent:
+                parent_mat = bone.parent.matrix_local
+                local_rot = (parent_mat.inverted_safe() @ rest_mat).to_quaternion()
+            else:
+                parent_mat = Matrix.Identity(4)
+                local_rot = rest_mat.to_quaternion()
+
+        rotation_mode = arm_obj.pose.bones[bone.name].rotation_mode if bone else None
+        if fixes and not bone:
+            rotation_mode = 'QUATERNION'
+
+        transformations = data.transfomations.items()
+        if fixes:
+            transformations = sorted(transformations)
+
+        keyframes = []
+        for time, tr in transformations:
+            kf_pos = tr.location
+            if rotation_mode == 'QUATERNION':
+                kf_rot = tr.rotation_quaternion
+            elif fixes and rotation_mode != 'AXIS_ANGLE':
+                kf_rot = Euler(tr.rotation_euler, rotation_mode).to_quaternion()
+            else:
+                kf_rot = tr.rotation_euler.to_quaternion()
+            kf_scl = tr.scale
+
+            if bone:
+                basis_mat = translation_matrix(kf_pos) @ scale_matrix(kf_scl)
+                local_mat = basis_to_local_matrix(basis_mat, rest_mat, parent_mat)
+
+                kf_pos = local_mat.to_translation()
+                kf_rot = local_rot.inverted().rotation_difference(kf_rot)
+                kf_scl = local_mat.to_scale()
+
+            keyframes.append(Keyframe(time / fps, kf_pos, kf_rot, kf_scl))
+
+        bones.append((bone_name, ''.join(data.type), data.bone_id, keyframes))
+
+    return bones
@@ -0,0 +1,134 @@
+"""Keyframe-by-keyframe IFP writer of the original gtaLib, used as the byte-level reference"""
+
+import struct
+
+from io import BytesIO
+
+
+def write_val(fd, vals, t):
+    data = vals if hasattr(vals, '__len__') else (vals, )
+    fd.write(struct.pack('<%d%s' % (len(data), t), *data))
+
+
+def write_str(fd, val, max_len):
+    fd.write(val[:max_len].encode())
+    fd.write(b'\x00' * (max_len - len(val)))
+
+
+def anp3_bone_size(bone):
+    return 36 + len(bone.keyframes) * (16 if bone.keyframe_type[2] == 'T' else 10)
+
+
+def write_anp3_bone(fd, bone):
+    keyframe_type = 4 if bone.keyframe_type[2] == 'T' else 3
+
+    write_str(fd, bone.name, 24)
+    write_val(fd, (keyframe_type, len(bone.keyframes)), 'I')
+    write_val(fd, bone.bone_id, 'i')
+
+    for kf in bone.keyframes:
+        qw, qx, qy, qz = kf.rot
+        write_val(fd, (int(qx*4096.0), int(qy*4096.0), int(qz*4096.0), int(qw*4096.0), int(kf.time)), 'h')
+
+        if keyframe_type == 4:
+            write_val(fd, tuple(int(v*1024.0) for v in kf.pos), 'h')
+
+
+def write_anp3(fd, data):
+    anim_sizes = [36 + sum(anp3_bone_size(b) for b in a.bones) for a in data.animations]
+
+    write_val(fd, 28 + sum(anim_sizes), 'I')
+    write_str(fd, data.name, 24)
+    write_val(fd, len(data.animations), 'I')
+
+    for anim in data.animations:
+        keyframes_size = sum(anp3_bone_size(b) - 36 for b in anim.bones)
+        write_str(fd, anim.name, 24)
+        write_val(fd, (len(anim.bones), keyframes_size, 1), 'I')
+        for b in anim.bones:
+            write_anp3_bone(fd, b)
+
+
+def anpk_keyframes_size(bone):
+    s = 20
+    if bone.keyframe_type[2] == 'T':
+        s += 12
+    if bone.keyframe_type[3] == 'S':
+        s += 12
+    return len(bone.keyframes) * s
+
+
+def anpk_bone_size(bone):
+    return anpk_keyframes_size(bone) + (44 if bone.use_bone_id else 48) + 24
+
+
+def anpk_animation_size(anim):
+    name_len = len(anim.name) + 1
+    return 32 + name_len + (4 - name_len % 4) % 4 + sum(anpk_bone_size(b) for b in anim.bones)
+
+
+def write_anpk_bone(fd, bone):
+    keyframes_num = len(bone.keyframes)
+    anim_len = 44 if bone.use_bone_id else 48
+    keyframes_len = anpk_keyframes_size(bone)
+
+    write_str(fd, 'CPAN', 4)
+    write_val(fd, keyframes_len + anim_len + 16, 'I')
+    write_str(fd, 'ANIM', 4)
+    write_val(fd, anim_len, 'I')
+    write_str(fd, bone.name, 28)
+    write_val(fd, (keyframes_num, 0, keyframes_num - 1), 'I')
+
+    if bone.use_bone_id:
+        write_val(fd, bone.bone_id, 'i')
+    else:
+        write_val(fd, (bone.sibling_x, bone.sibling_y), 'i')
+
+    write_str(fd, bone.keyframe_type, 4)
+    write_val(fd, keyframes_len, 'I')
+
+    for kf in bone.keyframes:
+        # Rotations are stored conjugated
+        qw, qx, qy, qz = kf.rot
+        write_val(fd, (-qx, -qy, -qz, qw), 'f')
+
+        if bone.keyframe_type[2] == 'T':
+            write_val(fd, kf.pos, 'f')
+
+        if bone.keyframe_type[3] == 'S':
+            write_val(fd, kf.scl, 'f')
+
+        write_val(fd, kf.time, 'f')
+
+
+def write_anpk(fd, data):
+    name_len = len(data.name) + 1
+    name_align_len = (4 - name_len % 4) % 4
+
+    write_val(fd, 12 + name_len + name_align_len + sum(anpk_animation_size(a) for a in data.animations), 'I')
+    write_str(fd, 'INFO', 4)
+    write_val(fd, (name_len + 4, len(data.animations)), 'I')
+    write_str(fd, data.name, name_len + name_align_len)
+
+    for anim in data.animations:
+        anim_name_len = len(anim.name) + 1
+        write_str(fd, 'NAME', 4)
+        write_val(fd, anim_name_len, 'I')
+        write_str(fd, anim.name, anim_name_len + (4 - anim_name_len % 4) % 4)
+        write_str(fd, 'DGAN', 4)
+        write_val(fd, 16 + sum(anpk_bone_size(b) for b in anim.bones), 'I')
+        write_str(fd, 'INFO', 4)
+        write_val(fd, (8, len(anim.bones), 0), 'I')
+        for b in anim.bones:
+            write_anpk_bone(fd, b)
+
+
+def pack_reference(ifp):
+    fd = BytesIO()
+    write_str(fd, ifp.version, 4)
+    if ifp.version == 'ANP3':
+        write_anp3(fd, ifp.data)
+    else:
+        write_anpk(fd, ifp.data)
+    fd.write(b'\x00' * (2048 - (fd.tell() % 2048)))
+    return fd.getvalue()
@@ -0,0 +1,165 @@
+import json
+import struct
+
+from io import BytesIO
+
+import pytest
+
+from gtaLib.ifp import (
+    Anp3,
+    Anpk,
+    AnpkAnimation,
+    AnpkBone,
+    Ifp,
+    IfpWriter,
+    KeyframeTrack,
+    MemoryReader,
+)
+from gtaLib.ifp_toc import get_cache_path, get_file_key, load_toc
+from reference_ifp import pack_reference
+from synthetic import make_ifp
+
+
+VERSIONS = ('ANP3', 'ANPK')
+
+
+def pack(ifp):
+    fd = BytesIO()
+    ifp.write(fd)
+    return fd.getvalue()
+
+
+def make_test_ifp(version):
+    ifp = make_ifp(version, animations_num=6, bones_num=5, seed=1)
+    if version == 'ANPK':
+        # Sibling ids instead of a bone id
+        bone = ifp.data.animations[0].bones[1]
+        bone.use_bone_id, bone.bone_id, bone.sibling_x, bone.sibling_y = False, -1, 3, 4
+    return ifp
+
+
+@pytest.fixture(params=VERSIONS)
+def ifp_file(request, tmp_path):
+    ifp = make_test_ifp(request.param)
+    filepath = tmp_path / f'{request.param}.ifp'
+    filepath.write_bytes(pack_reference(ifp))
+    return ifp, str(filepath)
+
+
+@pytest.mark.parametrize('version', VERSIONS)
+def test_write_matches_reference(version):
+    ifp = make_test_ifp(version)
+    assert pack(ifp) == pack_reference(ifp)
+
+
+def test_read_write_round_trip(ifp_file):
+    ifp, filepath = ifp_file
+    with open(filepath, 'rb') as fd:
+        data = fd.read()
+
+    loaded = Ifp.load(filepath)
+    assert loaded == ifp
+    assert pack(loaded) == data
+    assert pack(Ifp.read(MemoryReader(data))) == data
+
+
+def test_anpk_scale_only_keyframes():
+    keyframes = KeyframeTrack([0.0, 0.5], [1, 0, 0, 0, 0.5, 0.5, 0.5, 0.5], (), [1, 2, 3, 4, 5, 6])
+    bone = AnpkBone('Bone', 'KR0S', True, 3, 0, 0, keyframes)
+    ifp = Ifp('ANPK', Anpk('test', [AnpkAnimation('anim', [bone])]))
+
+    data = pack(ifp)
+    assert data == pack_reference(ifp)
+    assert Ifp.read(BytesIO(data)) == ifp
+
+
+def test_lazy_and_cached_loads_match_eager_load(ifp_file, toc_cache_dir, monkeypatch):
+    ifp, filepath = ifp_file
+    eager = Ifp.load(filepath)
+
+    lazy = Ifp.load(filepath, lazy=True)
+    assert list(toc_cache_dir.iterdir())
+    assert lazy.version == eager.version
+    assert lazy.data.name == eager.data.name
+    assert list(lazy.data.animations) == eager.data.animations
+
+    # The second lazy load is built from the cached table of contents without scanning
+    def fail_scan(*args):
+        raise AssertionError('file scanned despite the cached table of contents')
+
+    monkeypatch.setattr(Ifp, 'scan', fail_scan)
+    cached = Ifp.load(filepath, lazy=True)
+    assert cached.data.animations.entries == lazy.data.animations.entries
+    assert list(cached.data.animations) == eager.data.animations
+
+
+@pytest.mark.parametrize('corrupt', (
+    lambda toc: [toc],
+    lambda toc: dict(toc, version=None),
+    lambda toc: dict(toc, animations={}),
+    lambda toc: dict(toc, animations=[dict(toc['animations'][0], size=1 << 40)]),
+    lambda toc: dict(toc, animations=[dict(toc['animations'][0], keyframes_nums=None)]),
+))
+def test_malformed_cache_is_ignored(ifp_file, corrupt):
+    ifp, filepath = ifp_file
+    Ifp.load(filepath, lazy=True)
+
+    cache_path = get_cache_path(get_file_key(filepath)[0])
+    with open(cache_path, 'r', encoding='utf-8') as fd:
+        toc = json.load(fd)
+    with open(cache_path, 'w', encoding='utf-8') as fd:
+        json.dump(corrupt(toc), fd)
+
+    assert load_toc(filepath) is None
+    assert list(Ifp.load(filepath, lazy=True).data.animations) == ifp.data.animations
+
+
+def test_lazy_list_reads_from_open_file(ifp_file):
+    ifp, filepath = ifp_file
+    animations = Ifp.load(filepath, lazy=True, use_cache=False).data.animations
+
+    raw = [animations.read_raw(e) for e in animations.entries]
+    with animations:
+        assert [animations.read_raw(e) for e in animations.entries] == raw
+        assert animations[2] == ifp.data.animations[2]
+
+    assert [Ifp.decode_animation(ifp.version, data) for data in raw] == ifp.data.animations
+
+
+def test_iter_animations(ifp_file):
+    ifp, filepath = ifp_file
+    assert list(Ifp.iter_animations(filepath)) == ifp.data.animations
+
+
+def test_writer_patches_header(ifp_file):
+    ifp, filepath = ifp_file
+    with open(filepath, 'rb') as fd:
+        data = fd.read()
+
+    fd = BytesIO()
+    with IfpWriter(fd, ifp.version, ifp.data.name) as writer:
+        for anim in ifp.data.animations:
+            writer.write_animation(anim)
+
+    res = fd.getvalue()
+    assert res == data
+    assert len(res) % 2048 == 0
+
+    size = struct.unpack_from('<I', res, 4)[0]
+    if ifp.version == 'ANP3':
+        animations_num = struct.unpack_from('<I', res, 32)[0]
+        assert size == 28 + sum(a.get_size() for a in ifp.data.animations)
+    else:
+        animations_num = struct.unpack_from('<I', res, 16)[0]
+        assert size == ifp.data.get_size() - 4
+    assert animations_num == len(ifp.data.animations)
+
+
+def test_writer_without_animations():
+    fd = BytesIO()
+    with IfpWriter(fd, 'ANP3', 'empty'):
+        pass
+
+    res = fd.getvalue()
+    assert res == pack_reference(Ifp('ANP3', Anp3('empty', [])))
+    assert Ifp.read(BytesIO(res)).data.animations == []
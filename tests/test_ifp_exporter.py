@@ -0,0 +1,124 @@
+import pytest
+
+from conftest import bpy, import_addon_module
+
+
+FPS = 30.0
+
+
+def add_curve(act, data_path, index, keys, group=''):
+    curve = act.fcurves.new(data_path, index=index, action_group=group)
+    curve.keyframe_points.add(len(keys))
+    for kp, co in zip(curve.keyframe_points, keys):
+        kp.co = co
+        kp.interpolation = 'LINEAR'
+    return curve
+
+
+def add_channel(act, data_path, frames, values, group=''):
+    """Curves of a channel, values holds a column per component"""
+    for i, column in enumerate(values):
+        add_curve(act, data_path, i, list(zip(frames, column)), group)
+
+
+@pytest.fixture
+def pose_action(armature):
+    """Pose curves whose components and channels are keyed at different frames"""
+    act = bpy.data.actions.new('pose')
+    act.ifp.target_armature = armature
+
+    add_channel(act, 'pose.bones["Root"].location', (0, 10), ((0.1, 0.3), (0.2, -0.4), (0.0, 0.5)))
+    # Frame 5 is first keyed after frame 10
+    add_channel(act, 'pose.bones["Root"].rotation_quaternion', (0, 5, 10),
+                ((1.0, 0.9, 0.7), (0.0, 0.3, 0.5), (0.0, -0.2, 0.4), (0.0, 0.1, 0.3)))
+    add_curve(act, 'pose.bones["Root"].scale', 0, ((0, 1.0), (10.6, 1.5)))
+    add_curve(act, 'pose.bones["Root"].scale', 1, ((0, 1.0), (10, 1.2)))
+
+    # Two keys in frame 7 and a component keyed at other frames
+    armature.pose.bones['Spine'].rotation_mode = 'ZXY'
+    add_curve(act, 'pose.bones["Spine"].rotation_euler', 0, ((0, 0.0), (7.5, 0.4), (7.9, 0.6)))
+    add_curve(act, 'pose.bones["Spine"].rotation_euler', 1, ((0, 0.1), (12, -0.3)))
+    add_curve(act, 'pose.bones["Spine"]["weight"]', 0, ((3, 1.0), ))
+
+    add_channel(act, 'pose.bones["Head"].rotation_quaternion', (-1.5, 2),
+                ((0.8, 0.6), (0.6, 0.0), (0.0, 0.8), (0.0, 0.0)))
+
+    # IFP data of a pose bone is overridden by its pose curves
+    add_channel(act, 'ifp//Head//2//R', (0, 1), ((1, 1), (0, 0), (0, 0), (0, 0)), 'ifp')
+
+    return act
+
+
+@pytest.fixture
+def ifp_action(addon):
+    """IFP curves of an action that was not retargeted"""
+    act = bpy.data.actions.new('ifp')
+
+    add_channel(act, 'ifp//Pelvis//0//R', (0, 1, 2),
+                ((1.0, 0.8, 0.6), (0.0, 0.6, 0.0), (0.0, 0.0, 0.8), (0.0, 0.0, 0.0)), 'ifp')
+    add_channel(act, 'ifp//Pelvis//0//T', (0, 1, 2), ((0.0, 0.1, 0.2), (1.0, 1.0, 1.0), (0.5, 0.4, 0.3)), 'ifp')
+    add_curve(act, 'ifp//Pelvis//0//S', 0, ((0, 1.0), (1, 1.1), (2, 1.2)), 'ifp')
+    add_curve(act, 'ifp//Pelvis//0//S', 1, ((0, 1.0), (2, 0.9)), 'ifp')
+    add_curve(act, 'ifp//Pelvis//0//S', 2, ((0, 1.0), (1, 1.0), (2, 1.0)), 'ifp')
+    add_channel(act, 'ifp//Extra//None//R', (0, 4), ((0.6, 1.0), (0.8, 0.0), (0.0, 0.0), (0.0, 0.0)), 'ifp')
+
+    return act
+
+
+def export(act):
+    exporter = import_addon_module('ops.ifp_exporter')
+    ifp = import_addon_module('gtaLib.ifp')
+    return next(exporter.create_ifp_animations(bpy.context, ifp.Anpk, [act], FPS))
+
+
+def export_reference(act, fixes=True):
+    import reference_exporter
+    return reference_exporter.export_action(act, act.ifp.target_armature, FPS, fixes)
+
+
+def get_bone(bones, name):
+    return next(b for b in bones if (b.name if hasattr(b, 'name') else b[0]) == name)
+
+
+def assert_keyframes_equal(keyframes, reference):
+    assert [kf.time for kf in keyframes] == pytest.approx([kf.time for kf in reference])
+    for kf, ref in zip(keyframes, reference):
+        assert kf.rot == pytest.approx(tuple(ref.rot), abs=1e-5)
+        assert kf.pos == pytest.approx(tuple(ref.pos), abs=1e-5)
+        assert kf.scl == pytest.approx(tuple(ref.scl), abs=1e-5)
+
+
+@pytest.mark.parametrize('action', ('pose_action', 'ifp_action'))
+def test_export_matches_reference(request, action):
+    act = request.getfixturevalue(action)
+    anim = export(act)
+    reference = export_reference(act)
+
+    assert [(b.name, b.keyframe_type, b.bone_id) for b in anim.bones] == [r[:3] for r in reference]
+    for bone, (_, _, _, keyframes) in zip(anim.bones, reference):
+        assert_keyframes_equal(bone.keyframes, keyframes)
+
+
+
+def test_export_fixes(pose_action, ifp_action):
+    original = export_reference(ifp_action, fixes=False)
+    anim = export(ifp_action)
+
+    # Stored translations were dropped
+    assert get_bone(original, 'Pelvis')[1] == 'KR0S'
+    pelvis = get_bone(anim.bones, 'Pelvis')
+    assert pelvis.keyframe_type == 'KRTS'
+    assert [v for kf in pelvis.keyframes for v in kf.pos] == pytest.approx([0.0, 1.0, 0.5, 0.1, 1.0, 0.4, 0.2, 1.0, 0.3])
+
+    # Bones without a pose bone lost their rotations
+    assert [tuple(kf.rot) for kf in get_bone(original, 'Extra')[3]] == [(1, 0, 0, 0)] * 2
+    assert [v for kf in get_bone(anim.bones, 'Extra').keyframes for v in kf.rot] == pytest.approx([0.6, 0.8, 0, 0, 1, 0, 0, 0])
+
+    original = export_reference(pose_action, fixes=False)
+    anim = export(pose_action)
+
+    # Frames followed the curve order and other pose bone properties added keyframes
+    assert [round(kf.time * FPS) for kf in get_bone(original, 'Root')[3]] == [0, 10, 5]
+    assert [round(kf.time * FPS) for kf in get_bone(anim.bones, 'Root').keyframes] == [0, 5, 10]
+    assert [round(kf.time * FPS) for kf in get_bone(original, 'Spine')[3]] == [0, 7, 12, 3]
+    assert [round(kf.time * FPS) for kf in get_bone(anim.bones, 'Spine').keyframes] == [0, 7, 12]
@@ -0,0 +1,215 @@
+import math
+import os
+
+import pytest
+
+from conftest import bpy, import_addon_module
+from synthetic import make_ifp
+
+
+def make_operator(**props):
+    """The methods of the import operator on a plain object.
+
+    Blender only creates operators when running them, which leaves no way to step
+    through a background import outside of the event loop.
+    """
+    operator = import_addon_module('gui.operator')
+    methods = {name: value for name, value in vars(operator.ImportGtaIfp).items() if callable(value)}
+    cls = type('ImportOperator', (), methods)
+    cls.report = lambda self, level, message: self.reports.append((level, message))
+
+    op = cls()
+    op.reports = []
+    op.fps = 30.0
+    op.use_armature = True
+    op.animation_names = ''
+    op.use_profile = False
+    op.use_proxy = False
+    op.use_update = False
+    op.use_modal = False
+    for name, value in props.items():
+        setattr(op, name, value)
+    return op
+
+
+def write_ifp(filepath, ifp, version):
+    with open(filepath, 'wb') as fd:
+        ifp.write(fd)
+
+    # The table of contents cache is keyed by the modification time
+    st = os.stat(filepath)
+    os.utime(filepath, ns=(st.st_atime_ns, st.st_mtime_ns + version * 1000000))
+
+
+def get_action_state(act):
+    """Source properties and keyframes of an action"""
+    ifp_importer = import_addon_module('ops.ifp_importer')
+    keyframes = {(c.data_path, c.array_index): [tuple(kp.co) for kp in c.keyframe_points] for c in act.fcurves}
+    return ifp_importer.get_action_source(act), keyframes
+
+
+CHANGED_ANIMATIONS = ('anim_001', 'anim_003')
+
+
+@pytest.fixture
+def imported_actions(armature, tmp_path):
+    """Actions imported from a file whose animations in CHANGED_ANIMATIONS have changed since"""
+    filepath = str(tmp_path / 'ped.ifp')
+    ifp = make_ifp('ANP3', animations_num=4, bones_num=3, seed=4)
+    write_ifp(filepath, ifp, 1)
+
+    op = make_operator(filepath=filepath)
+    assert op.begin_import(bpy.context)
+    op.import_step(math.inf)
+
+    # Changed animations can also move the offsets of the following ones
+    changed = make_ifp('ANP3', animations_num=4, bones_num=3, seed=5).data.animations
+    ifp.data.animations = [changed[i] if a.name in CHANGED_ANIMATIONS else a for i, a in enumerate(ifp.data.animations)]
+    write_ifp(filepath, ifp, 2)
+
+    return filepath, {act.name: act for act in op._created_actions}
+
+
+def run_update(filepath, steps=None):
+    """Update the actions in a background import, stopping after the given number of steps"""
+    op = make_operator(filepath=filepath, use_update=True, use_modal=True)
+    assert op.begin_import(bpy.context)
+
+    completed = False
+    while not completed and steps != 0:
+        completed = op.import_step(0.0)
+        steps = steps - 1 if steps else steps
+    return op, completed
+
+
+def assign_action(arm_obj, act):
+    animation_data = arm_obj.animation_data or arm_obj.animation_data_create()
+    animation_data.action = act
+    track = animation_data.nla_tracks.new()
+    return track.strips.new(act.name, 1, act)
+
+
+def test_update_rebuilds_changed_actions(imported_actions, armature):
+    filepath, actions = imported_actions
+    states = {name: get_action_state(act) for name, act in actions.items()}
+    strip = assign_action(armature, actions['anim_001'])
+
+    op, completed = run_update(filepath)
+    assert completed
+    op.finish_import()
+
+    stats = op._stats.counters
+    assert (stats['updated_actions'], stats['unchanged_actions']) == (2, 2)
+    assert sorted(act.name for act in bpy.data.actions) == sorted(actions)
+
+    for name, (source, keyframes) in states.items():
+        act = bpy.data.actions[name]
+        new_source, new_keyframes = get_action_state(act)
+        assert (new_keyframes != keyframes) == (name in CHANGED_ANIMATIONS)
+        assert (new_source['content_hash'] != source['content_hash']) == (name in CHANGED_ANIMATIONS)
+        assert act.ifp.target_armature == armature
+
+    # The users of a rebuilt action use its replacement
+    assert armature.animation_data.action == bpy.data.actions['anim_001']
+    assert strip.action == bpy.data.actions['anim_001']
+
+
+@pytest.mark.parametrize('steps', (1, 4, 5, 7))
+def test_cancel_restores_updated_actions(imported_actions, armature, steps):
+    filepath, actions = imported_actions
+    states = {name: get_action_state(act) for name, act in actions.items()}
+    strip = assign_action(armature, actions['anim_001'])
+
+    # Esc while building the actions and while applying the updates of every action
+    op, completed = run_update(filepath, steps)
+    assert not completed
+    op.cancel_import()
+
+    assert {act.name: get_action_state(act) for act in bpy.data.actions} == states
+    assert armature.animation_data.action == actions['anim_001']
+    assert strip.action == actions['anim_001']
+
+
+def test_failed_update_restores_actions(imported_actions, monkeypatch):
+    filepath, actions = imported_actions
+    states = {name: get_action_state(act) for name, act in actions.items()}
+
+    operator = import_addon_module('gui.operator')
+    create_action = operator.create_action
+    calls = []
+
+    def fail_create_action(*args):
+        calls.append(args)
+        if len(calls) > 1:
+            raise RuntimeError('create_action failed')
+        return create_action(*args)
+
+    monkeypatch.setattr(operator, 'create_action', fail_create_action)
+
+    op = make_operator(filepath=filepath, use_update=True, use_modal=True)
+    assert op.begin_import(bpy.context)
+    with pytest.raises(RuntimeError):
+        while not op.import_step(0.0):
+            pass
+    op.cancel_import()
+
+    assert {act.name: get_action_state(act) for act in bpy.data.actions} == states
+
+
+@pytest.fixture
+def proxy_actions(armature, tmp_path):
+    """Proxy actions of a file, assigned to the test armature"""
+    filepath = str(tmp_path / 'ped.ifp')
+    write_ifp(filepath, make_ifp('ANP3', animations_num=2, bones_num=3, seed=6), 1)
+
+    op = make_operator(filepath=filepath, use_proxy=True)
+    assert op.begin_import(bpy.context)
+    op.import_step(math.inf)
+    return filepath, op._created_actions
+
+
+def test_assigned_proxy_is_materialized_from_timer(proxy_actions, armature):
+    proxy_action = import_addon_module('ops.proxy_action')
+    _, (act, _) = proxy_actions
+
+    armature.animation_data_create().action = act
+    bpy.context.view_layer.update()
+
+    # The depsgraph handler only queues the action
+    assert act.ifp.is_proxy
+    assert bpy.app.timers.is_registered(proxy_action.materialize_pending_actions)
+
+    assert proxy_action.materialize_pending_actions() is None
+    assert not act.ifp.is_proxy and not act.ifp.materialize_error
+    assert act.ifp.target_armature == armature
+    assert len(act.fcurves) > 0
+
+
+def test_failed_proxy_is_not_retried(proxy_actions, armature):
+    proxy_action = import_addon_module('ops.proxy_action')
+    filepath, (act, other_act) = proxy_actions
+    write_ifp(filepath, make_ifp('ANP3', animations_num=2, bones_num=3, seed=7), 2)
+
+    armature.animation_data_create().action = act
+    bpy.context.view_layer.update()
+    proxy_action.materialize_pending_actions()
+
+    assert act.ifp.is_proxy
+    assert 'has changed' in act.ifp.materialize_error
+
+    # Other updates of the object do not queue it again
+    armature.location.x += 1.0
+    bpy.context.view_layer.update()
+    assert not proxy_action.pending_objects
+
+    # Reimporting the source gives it another chance
+    op = make_operator(filepath=filepath, use_proxy=True, use_update=True)
+    assert op.begin_import(bpy.context)
+    op.import_step(math.inf)
+    op.finish_import()
+    assert not act.ifp.materialize_error
+
+    armature.location.x += 1.0
+    bpy.context.view_layer.update()
+    proxy_action.materialize_pending_actions()
+    assert not act.ifp.is_proxy
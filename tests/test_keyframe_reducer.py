@@ -0,0 +1,80 @@
+import math
+
+import pytest
+
+from conftest import import_addon_module
+
+keyframe_reducer = import_addon_module('ops.keyframe_reducer')
+KeyframeReducer = keyframe_reducer.KeyframeReducer
+KeyframeTrack = keyframe_reducer.KeyframeTrack
+
+
+def quat_angle(q0, q1):
+    dot = abs(sum(a * b for a, b in zip(q0, q1)))
+    return 2.0 * math.acos(min(dot, 1.0))
+
+
+def make_track(keyframes_num, wobble):
+    times, rots, poss = [], [], []
+    for i in range(keyframes_num):
+        angle = 0.05 * i + wobble * math.sin(i * 1.7)
+        times.append(i / 30.0)
+        rots += (math.cos(angle / 2), 0.0, 0.0, math.sin(angle / 2))
+        poss += (0.02 * i + wobble * math.cos(i * 2.3), 0.0, 1.0)
+    return KeyframeTrack(times, rots, poss)
+
+
+def sample(track, time):
+    """Interpolate the track like the game does, slerp rotations and lerp translations"""
+    times = list(track.times)
+    j = next(j for j in range(1, len(times)) if times[j] >= time - 1e-6)
+    kf0, kf1 = track[j - 1], track[j]
+    t = (time - times[j - 1]) / (times[j] - times[j - 1])
+
+    q0, q1 = kf0.rot, kf1.rot
+    theta = math.acos(min(abs(sum(a * b for a, b in zip(q0, q1))), 1.0))
+    if theta < 1e-6:
+        rot = q0
+    else:
+        w0 = math.sin((1 - t) * theta) / math.sin(theta)
+        w1 = math.sin(t * theta) / math.sin(theta)
+        rot = [w0 * a + w1 * b for a, b in zip(q0, q1)]
+    pos = [a + t * (b - a) for a, b in zip(kf0.pos, kf1.pos)]
+    return rot, pos
+
+
+def test_linear_track_reduces_to_end_keyframes():
+    track = make_track(30, 0.0)
+    res = KeyframeReducer(1e-3, 1e-4).reduce_track(track)
+    assert len(res) == 2
+    assert res[0] == track[0] and res[1] == track[-1]
+
+
+def test_short_tracks_are_kept():
+    track = make_track(2, 0.0)
+    assert KeyframeReducer(1.0, 1.0).reduce_track(track) is track
+
+
+@pytest.mark.parametrize('angle_tolerance, location_tolerance', ((0.01, 0.005), (0.01, 0.008)))
+def test_reduced_track_is_within_tolerances(angle_tolerance, location_tolerance):
+    track = make_track(60, 0.005)
+    res = KeyframeReducer(angle_tolerance, location_tolerance).reduce_track(track)
+    assert 2 < len(res) < len(track)
+
+    # Kept keyframes are unchanged and every dropped one is rebuilt within the tolerances
+    kept = {kf.time: kf for kf in res}
+    for kf in track:
+        if kf.time in kept:
+            assert kept[kf.time] == kf
+            continue
+
+        rot, pos = sample(res, kf.time)
+        assert quat_angle(rot, kf.rot) <= angle_tolerance + 1e-5
+        assert math.dist(pos, kf.pos) <= location_tolerance + 1e-5
+
+
+def test_tighter_tolerances_keep_more_keyframes():
+    track = make_track(60, 0.005)
+    loose = KeyframeReducer(0.01, 0.008).reduce_track(track)
+    tight = KeyframeReducer(0.01, 0.005).reduce_track(track)
+    assert len(tight) > len(loose)
@@ -0,0 +1,69 @@
+import pytest
+
+from gtaLib.ifp import (
+    Anp3,
+    Anpk,
+    AnpkAnimation,
+    AnpkBone,
+    KeyframeTrack,
+    TranscodeStats,
+    quantize_fixed,
+    transcode_animation,
+)
+from synthetic import make_ifp
+
+
+def test_quantize_fixed_rounds_to_nearest():
+    values = [0.1, -0.37, 0.5 / 4096, 1.5 / 4096, 0.99999]
+    res = quantize_fixed(values, 4096.0)
+    assert list(res) == [round(v * 4096.0) / 4096.0 for v in values]
+
+    res = quantize_fixed(values, 4096.0, dequantize=False)
+    assert list(res) == [round(v * 4096.0) for v in values]
+
+
+def test_quantize_fixed_clamps_to_int16():
+    stats = TranscodeStats()
+    res = quantize_fixed([40.0, -40.0, 1.0], 1024.0, stats, 'translation_error')
+    assert list(res) == [32767.0 / 1024.0, -32.0, 1.0]
+    assert stats.clamped_values == 2
+
+
+@pytest.mark.parametrize('fps', (30, 30.0, 25))
+def test_anpk_to_anp3(fps):
+    anim = make_ifp('ANPK', animations_num=1, bones_num=8, seed=2).data.animations[0]
+    stats = TranscodeStats()
+    res = transcode_animation(anim, Anp3, fps, stats)
+
+    for src, dst in zip(anim.bones, res.bones):
+        assert dst.keyframe_type == ('KRT0' if src.keyframe_type[2] == 'T' else 'KR00')
+        assert list(dst.keyframes.times) == [round(t * fps) for t in src.keyframes.times]
+        assert all(v * 4096.0 == int(v * 4096.0) for v in dst.keyframes.rots)
+        assert all(v * 1024.0 == int(v * 1024.0) for v in dst.keyframes.poss)
+        assert not dst.keyframes.scls
+
+    # Rounding errors stay within half a fixed point step, times are reported in frames
+    assert stats.rotation_error <= 0.5 / 4096.0 + 1e-7
+    assert stats.translation_error <= 0.5 / 1024.0 + 1e-7
+    assert stats.time_error <= 0.5
+    assert stats.clamped_values == 0
+    assert stats.dropped_scales == sum(1 for b in anim.bones if b.keyframe_type[3] == 'S')
+
+    # Integer and float frame rates quantize identically
+    assert transcode_animation(anim, Anp3, float(fps)) == res
+
+
+def test_anp3_round_trip_is_exact():
+    anim = make_ifp('ANP3', animations_num=1, bones_num=8, seed=3).data.animations[0]
+    anpk = transcode_animation(anim, Anpk, 30)
+    assert transcode_animation(anpk, Anp3, 30) == anim
+
+
+def test_clamped_translations_are_counted():
+    keyframes = KeyframeTrack([0.0, 1 / 30], [1, 0, 0, 0] * 2, [0, 0, 0, 50, 0, 0])
+    anim = AnpkAnimation('anim', [AnpkBone('Bone', 'KRT0', True, 0, 0, 0, keyframes)])
+    stats = TranscodeStats()
+    res = transcode_animation(anim, Anp3, 30, stats)
+
+    assert list(res.bones[0].keyframes.poss) == [0, 0, 0, 32767.0 / 1024.0, 0, 0]
+    assert stats.clamped_values == 1